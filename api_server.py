@@ -0,0 +1,353 @@
+"""
+Headless HTTP API around the event planning graph, for services that cannot
+go through the Streamlit app.
+
+    POST /v1/plan         one request (the fields of a batch_runner line) -> plan record
+    POST /v1/plan/stream  the same as server-sent events: a "node" event per finished
+                          node, "token" events while the recommendation streams, then "result"
+    POST /v1/batch        {"requests": [...], "recommendation_mode": ...} -> records in request order
+    GET  /healthz         status plus in-flight and queued plan counts
+    GET  /metrics         Prometheus text from the tracer
+
+At most server.max_concurrency plans run at once and server.max_queue more may
+wait for a slot; anything beyond that, or waiting longer than
+queue_timeout_seconds, is answered with 429 and Retry-After. On SIGINT/SIGTERM
+the server stops accepting connections, answers new requests with 503 and
+gives in-flight plans drain_timeout_seconds to finish.
+
+    python api_server.py --port 8080
+"""
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+
+from aiohttp import web
+
+from batch_runner import BatchStats, request_to_input, serialize_result
+from graph_builder import get_compiled_graph
+from plan_cache import ainvoke_plan, astream_plan, prepare
+from rule_engine import RECOMMENDATION_MODES
+from settings import SettingsError, get_settings
+from tracing import configure_tracing, span, tracer
+
+# Seconds suggested to rejected clients before retrying
+RETRY_AFTER_SECONDS = 1
+
+
+class AdmissionError(Exception):
+    """Raised when a plan cannot be admitted; status is the HTTP status to answer with"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Admission:
+    """Bounded concurrency with a bounded wait queue in front of it.
+
+    Callers reserve() their places synchronously, so a whole batch is admitted
+    or rejected at once, then hold a slot() per plan while it runs.
+    """
+
+    def __init__(self, max_concurrency, max_queue, queue_timeout):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.queued = 0
+        self.draining = False
+        self.rejected = Counter()
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def reserve(self, count=1):
+        """Reserve count places, or raise AdmissionError when draining or full"""
+        if count == 0:
+            return
+        if self.draining:
+            self.rejected["draining"] += count
+            raise AdmissionError(503, "server is shutting down")
+        if self.in_flight + self.queued + count > self.max_concurrency + self.max_queue:
+            self.rejected["queue_full"] += count
+            raise AdmissionError(429, "too many plans in progress, retry later")
+        self.queued += count
+        self._idle.clear()
+
+    def _check_idle(self):
+        if self.in_flight == 0 and self.queued == 0:
+            self._idle.set()
+
+    @asynccontextmanager
+    async def slot(self):
+        """Wait for a run slot for one reserved place; yields the time spent queued in ms"""
+        waiting_since = time.perf_counter()
+        acquired = False
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            acquired = True
+        except asyncio.TimeoutError:
+            self.rejected["queue_timeout"] += 1
+            raise AdmissionError(429, "timed out waiting for a plan slot") from None
+        finally:
+            self.queued -= 1
+            if acquired:
+                self.in_flight += 1
+            else:
+                # Timed out or cancelled while queued
+                self._check_idle()
+        try:
+            yield (time.perf_counter() - waiting_since) * 1000
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+            self._check_idle()
+
+    async def drain(self, timeout):
+        """Stop admitting plans and wait up to timeout seconds for the running ones"""
+        self.draining = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            print(f"[api] drain timed out with {self.in_flight} plans in flight", file=sys.stderr)
+
+    def stats(self):
+        return {"in_flight": self.in_flight, "queued": self.queued, "rejected": dict(self.rejected)}
+
+
+class Planner:
+    """Runs plans through the compiled graph under admission control"""
+
+    def __init__(self, admission, graph=None):
+        self.admission = admission
+        self._graph = graph
+
+    @property
+    def graph(self):
+        # The registry hands back the cached graph and rebuilds it after a settings change
+        return self._graph or get_compiled_graph()
+
+    async def plan(self, request_id, graph_input):
+        """Run one reserved plan and return its record"""
+        started = time.perf_counter()
+        record = {"id": request_id}
+        try:
+            async with self.admission.slot() as queue_ms:
+                with span("plan", "api", queue_ms=queue_ms):
+                    state = await ainvoke_plan(self.graph, graph_input)
+            record["status"] = "ok"
+            record["result"] = serialize_result(state)
+        except AdmissionError as e:
+            record["status"] = "rejected"
+            record["error"] = str(e)
+        except Exception as e:
+            record["status"] = "error"
+            record["error"] = str(e)
+        record["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return record
+
+
+PLANNER = web.AppKey("planner", Planner)
+
+_RECORD_STATUS = {"ok": 200, "rejected": 429, "error": 500}
+
+
+def _error(status, message):
+    headers = {"Retry-After": str(RETRY_AFTER_SECONDS)} if status in (429, 503) else None
+    return web.json_response({"status": "error", "error": message}, status=status, headers=headers)
+
+
+async def _json_body(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise AdmissionError(400, "request body must be a JSON object") from None
+    if not isinstance(body, dict):
+        raise AdmissionError(400, "request body must be a JSON object")
+    return body
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+def _node_update(update):
+    """The user-facing keys of a node's state update, JSON-serializable"""
+    return {key: value for key, value in serialize_result(update).items() if key in update}
+
+
+async def handle_plan(request):
+    planner = request.app[PLANNER]
+    try:
+        body = await _json_body(request)
+        graph_input = request_to_input(body)
+        planner.admission.reserve()
+    except ValueError as e:
+        return _error(400, str(e))
+    except AdmissionError as e:
+        return _error(e.status, str(e))
+
+    record = await planner.plan(body.get("id"), graph_input)
+    headers = {"Retry-After": str(RETRY_AFTER_SECONDS)} if record["status"] == "rejected" else None
+    return web.json_response(record, status=_RECORD_STATUS[record["status"]], headers=headers)
+
+
+async def handle_plan_stream(request):
+    planner = request.app[PLANNER]
+    try:
+        body = await _json_body(request)
+        graph_input = request_to_input(body)
+        planner.admission.reserve()
+    except ValueError as e:
+        return _error(400, str(e))
+    except AdmissionError as e:
+        return _error(e.status, str(e))
+
+    started = time.perf_counter()
+    response = None
+    try:
+        async with planner.admission.slot() as queue_ms:
+            key, graph_input = prepare(graph_input)
+            # Headers go out only once the plan is admitted, so rejections are still plain 429s
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+            await response.prepare(request)
+            state = dict(graph_input)
+            with span("plan", "api_stream", queue_ms=queue_ms):
+                async for mode, chunk in astream_plan(planner.graph, key, graph_input):
+                    if mode == "messages":
+                        message, metadata = chunk
+                        if metadata.get("langgraph_node") == "recommendation_analyzer" and message.content:
+                            await response.write(_sse("token", {"text": message.content}))
+                        continue
+                    for node, update in chunk.items():
+                        if not update:
+                            continue
+                        state.update(update)
+                        await response.write(_sse("node", {"node": node, "update": _node_update(update)}))
+            record = {"id": body.get("id"), "status": "ok", "result": serialize_result(state)}
+    except AdmissionError as e:
+        return _error(e.status, str(e))
+    except ConnectionResetError:
+        # The client went away; the slot is already released
+        return response
+    except Exception as e:
+        if response is None:
+            return _error(500, str(e))
+        record = {"id": body.get("id"), "status": "error", "error": str(e)}
+
+    record["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    await response.write(_sse("result", record))
+    await response.write_eof()
+    return response
+
+
+async def handle_batch(request):
+    planner = request.app[PLANNER]
+    max_batch_size = get_settings().server.max_batch_size
+    try:
+        body = await _json_body(request)
+    except AdmissionError as e:
+        return _error(e.status, str(e))
+    requests = body.get("requests")
+    mode = body.get("recommendation_mode")
+    if not isinstance(requests, list) or not requests:
+        return _error(400, "'requests' must be a non-empty list")
+    if len(requests) > max_batch_size:
+        return _error(413, f"a batch holds at most {max_batch_size} requests")
+    if mode is not None and mode not in RECOMMENDATION_MODES:
+        return _error(400, f"recommendation_mode must be one of {', '.join(RECOMMENDATION_MODES)}")
+
+    records, runnable = [None] * len(requests), []
+    for index, item in enumerate(requests):
+        request_id = item.get("id", index) if isinstance(item, dict) else index
+        try:
+            if not isinstance(item, dict):
+                raise ValueError("each request must be a JSON object")
+            runnable.append((index, request_id, request_to_input(item, mode)))
+        except ValueError as e:
+            records[index] = {"id": request_id, "status": "error", "error": str(e)}
+
+    try:
+        # The whole batch is admitted or rejected together
+        planner.admission.reserve(len(runnable))
+    except AdmissionError as e:
+        return _error(e.status, str(e))
+
+    stats = BatchStats()
+    tasks = [asyncio.ensure_future(planner.plan(request_id, graph_input)) for _, request_id, graph_input in runnable]
+    try:
+        for (index, _, _), record in zip(runnable, await asyncio.gather(*tasks)):
+            records[index] = record
+    except asyncio.CancelledError:
+        # The client disconnected; stop the plans that have not finished
+        for task in tasks:
+            task.cancel()
+        raise
+    for record in records:
+        stats.record(record.get("latency_ms", 0.0), record["status"] == "ok")
+    return web.json_response({"results": records, "summary": stats.summary()})
+
+
+async def handle_health(request):
+    admission = request.app[PLANNER].admission
+    status = "draining" if admission.draining else "ok"
+    return web.json_response({"status": status, **admission.stats()}, status=503 if admission.draining else 200)
+
+
+async def handle_metrics(request):
+    return web.Response(text=tracer.prometheus_text(), content_type="text/plain")
+
+
+def create_app(graph=None, server_settings=None):
+    """Build the aiohttp application; graph defaults to the process-wide compiled graph"""
+    server_settings = server_settings or get_settings().server
+    planner = Planner(Admission(server_settings.max_concurrency, server_settings.max_queue,
+                                server_settings.queue_timeout_seconds), graph)
+
+    async def drain(app):
+        await planner.admission.drain(server_settings.drain_timeout_seconds)
+
+    app = web.Application()
+    app[PLANNER] = planner
+    app.router.add_post("/v1/plan", handle_plan)
+    app.router.add_post("/v1/plan/stream", handle_plan_stream)
+    app.router.add_post("/v1/batch", handle_batch)
+    app.router.add_get("/healthz", handle_health)
+    app.router.add_get("/metrics", handle_metrics)
+    app.on_shutdown.append(drain)
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the event planning graph over HTTP")
+    parser.add_argument("--host", help="Interface to bind (default: server.host in settings.yaml)")
+    parser.add_argument("--port", type=int, help="Port to listen on (default: server.port in settings.yaml)")
+    args = parser.parse_args(argv)
+
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    try:
+        server_settings = get_settings().server
+    except SettingsError as e:
+        parser.exit(2, f"[api] invalid configuration: {e}\n")
+
+    configure_tracing()
+    # Build the graph before accepting traffic so the first request does not pay for it
+    get_compiled_graph()
+    # aiohttp's own shutdown wait covers the drain plus writing the last responses
+    web.run_app(create_app(server_settings=server_settings), host=args.host or server_settings.host,
+                port=args.port or server_settings.port,
+                shutdown_timeout=math.ceil(server_settings.drain_timeout_seconds) + 5)
+
+
+if __name__ == "__main__":
+    main()
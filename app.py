@@ -11,6 +11,9 @@ import requests
 from langchain_core.messages import HumanMessage
 import json
 
+from constants import describe_weather_code
+from date_resolver import UnknownDateError, resolve_date
+
 # Load environment variables from .env file
 try:
     from dotenv import load_dotenv
@@ -100,16 +103,6 @@ with st.sidebar:
     - "Find places for a birthday party in London next weekend"
     """)
 
-# Weather codes dictionary
-weather_codes = {
-    0: "Clear sky", 1: "Mainly clear", 2: "Partly cloudy", 3: "Overcast",
-    45: "Fog", 48: "Depositing rime fog", 51: "Light drizzle", 53: "Moderate drizzle",
-    55: "Dense drizzle", 61: "Light rain", 63: "Moderate rain", 65: "Heavy rain",
-    71: "Light snow", 73: "Moderate snow", 75: "Heavy snow", 80: "Rain showers",
-    81: "Moderate rain showers", 82: "Violent rain showers", 95: "Thunderstorm",
-    96: "Thunderstorm with light hail", 99: "Thunderstorm with heavy hail",
-}
-
 
 # Define EventVenue model
 class EventVenue(BaseModel):
@@ -135,68 +128,6 @@ class ParentState(TypedDict):
     venues_ready: bool
 
 
-# Helper function to get the next date
-def get_next_date(date_str):
-    date_str = date_str.lower().strip()
-    days = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
-    today = datetime.date.today()
-    today_index = today.weekday()
-
-    # Handle weekend cases
-    if "weekend" in date_str:
-        # Find the next Saturday
-        days_to_saturday = (5 - today_index) % 7
-        if "next" in date_str:
-            # If it's already weekend, go to next weekend
-            if today_index >= 5:  # If today is Saturday or Sunday
-                days_to_saturday += 7
-            # If explicitly asking for next weekend
-            elif "next" in date_str:
-                days_to_saturday += 7
-        elif "this" in date_str:
-            # Use the upcoming weekend
-            pass
-
-        return today + datetime.timedelta(days=days_to_saturday)
-
-    # Handle other specific cases
-    if date_str.startswith("next "):
-        day_name = date_str[5:].strip()
-        try:
-            day_index = days.index(day_name)
-            days_ahead = (day_index - today_index) % 7 or 7
-            return today + datetime.timedelta(days=days_ahead)
-        except ValueError:
-            # If day name not found, return today as fallback
-            return today
-    elif date_str.startswith("this "):
-        day_name = date_str[5:].strip()
-        try:
-            day_index = days.index(day_name)
-            days_ahead = (day_index - today_index) % 7
-            return today + datetime.timedelta(days=days_ahead)
-        except ValueError:
-            # If day name not found, return today as fallback
-            return today
-    elif date_str.startswith("today"):
-        return today
-    elif date_str.startswith("tomorrow"):
-        return today + datetime.timedelta(days=1)
-    else:
-        try:
-            day_name = date_str
-            day_index = days.index(day_name)
-            days_ahead = (day_index - today_index) % 7 or 7
-            return today + datetime.timedelta(days=days_ahead)
-        except ValueError:
-            # Try to parse as YYYY-MM-DD
-            try:
-                return datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
-            except ValueError:
-                # Return today as fallback
-                return today
-
-
 # Node Functions
 class QueryAnalysis(BaseModel):
     location: str = Field(..., description="The city or place name for the event")
@@ -267,7 +198,11 @@ User query: {user_query}
 def weather_fetcher(state: ParentState):
     location = state['location']
     date_str = state['date']
-    target_date = get_next_date(date_str)
+    try:
+        target_date = resolve_date(date_str)
+    except UnknownDateError:
+        return {"weather_report": f"📍 **{location}**: Weather data not available (unrecognized date '{date_str}')",
+                "weather_ready": True}
 
     try:
         # Geocoding request
@@ -321,7 +256,7 @@ def weather_fetcher(state: ParentState):
             min_temp = data['temperature_2m_min'][index]
             precip_prob = data.get('precipitation_probability_max', [0] * len(data['time']))[index]
 
-            description = weather_codes.get(weather_code, "Unknown")
+            description = describe_weather_code(weather_code)
 
             # Format a more detailed weather report
             weather_report = {
@@ -463,11 +398,6 @@ Please try again later for more detailed recommendations.
         }
 
 
-# Check if both paths are complete
-def both_paths_complete(state):
-    return state.get("weather_ready") and state.get("venues_ready")
-
-
 # Build the Graph
 def build_event_planning_graph():
     parent_builder = StateGraph(ParentState)
@@ -483,23 +413,8 @@ def build_event_planning_graph():
     parent_builder.add_edge("query_analyzer", "event_planning_assistant")
     parent_builder.add_edge("event_planning_assistant", "venues_list_formatter")
 
-    # Use conditional routing to ensure both paths complete
-    parent_builder.add_conditional_edges(
-        "weather_fetcher",
-        lambda state: "recommendation_analyzer" if both_paths_complete(state) else "__wait__"
-    )
-
-    parent_builder.add_conditional_edges(
-        "venues_list_formatter",
-        lambda state: "recommendation_analyzer" if both_paths_complete(state) else "__wait__"
-    )
-
-    # Add a special "wait" node that routes back to itself until both conditions are met
-    parent_builder.add_node("__wait__", lambda state: state)
-    parent_builder.add_conditional_edges(
-        "__wait__",
-        lambda state: "recommendation_analyzer" if both_paths_complete(state) else "__wait__"
-    )
+    # Fan-in barrier: recommendation_analyzer runs once, after both branches finish
+    parent_builder.add_edge(["weather_fetcher", "venues_list_formatter"], "recommendation_analyzer")
 
     parent_builder.add_edge("recommendation_analyzer", END)
 
@@ -0,0 +1,233 @@
+"""
+Headless batch runner that streams planning requests from a JSONL file through
+the event planning graph with bounded concurrency.
+
+Each input line is a JSON object with either a free-text ``query`` or the form
+fields ``event_type``, ``location``, ``date`` and optional ``requirements``.
+Form fields enter the graph as structured input and skip query analysis. An
+optional ``recommendation_mode`` of "rules" builds the recommendation without
+the LLM, and ``flexible_date: true`` ranks the days in the forecast window.
+Results are written as JSONL in completion order. Plans run on a single event
+loop through the graph's async nodes; repeated requests are answered from the
+plan cache (plan_cache.py).
+
+    python batch_runner.py requests.jsonl -o results.jsonl -c 32
+"""
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+
+from langchain_core.messages import HumanMessage
+
+from graph_builder import get_compiled_graph, get_graph_metrics
+from plan_cache import ainvoke_plan, get_plan_cache_stats
+from prompt_compaction import get_compaction_stats
+from query_parser import get_parser_stats
+from rule_engine import RECOMMENDATION_MODES
+from settings import SettingsError, get_settings
+from tracing import configure_tracing, span, tracer
+from utils import build_structured_input, prewarm_geocode_cache
+
+# Keys copied from the final graph state into each output record
+RESULT_KEYS = ("event", "location", "date", "weather_report", "ranked_days", "venues", "recommendation")
+
+
+def read_requests(path):
+    """Yield (line_number, request) pairs from a JSONL file one line at a time"""
+    with open(path, 'r') as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, {"_error": f"Invalid JSON: {e}"}
+
+
+def request_to_input(request, recommendation_mode=None):
+    """Turn a batch request record into graph input"""
+    mode = request.get("recommendation_mode") or recommendation_mode
+    if mode is not None and mode not in RECOMMENDATION_MODES:
+        raise ValueError(f"recommendation_mode must be one of {', '.join(RECOMMENDATION_MODES)}")
+    if request.get("query"):
+        graph_input = {"messages": [HumanMessage(content=request["query"])]}
+        if mode:
+            graph_input["recommendation_mode"] = mode
+        if request.get("flexible_date"):
+            graph_input["flexible_date"] = True
+        return graph_input
+    event_type = request.get("event_type") or request.get("event")
+    location = request.get("location")
+    date_str = request.get("date")
+    if not event_type or not location or not date_str:
+        raise ValueError("request needs a 'query' or 'event_type', 'location' and 'date'")
+    return build_structured_input(event_type, location, date_str, request.get("requirements", ""), mode,
+                                  bool(request.get("flexible_date")))
+
+
+def serialize_result(state):
+    """Convert the final graph state into a JSON-serializable dict"""
+    result = {}
+    for key in RESULT_KEYS:
+        value = state.get(key)
+        if key == "venues" and value is not None:
+            value = [venue.model_dump() for venue in value]
+        result[key] = value
+    return result
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class BatchStats:
+    """Collect per-request latencies and compute throughput for a batch run"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.latencies_ms = []
+        self.succeeded = 0
+        self.failed = 0
+
+    def record(self, latency_ms, ok):
+        self.latencies_ms.append(latency_ms)
+        if ok:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        latencies = sorted(self.latencies_ms)
+        total = self.succeeded + self.failed
+        return {
+            "requests": total,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "elapsed_seconds": round(elapsed, 3),
+            "throughput_rps": round(total / elapsed, 3) if elapsed > 0 else 0.0,
+            "latency_ms": {
+                "mean": round(sum(latencies) / len(latencies), 1) if latencies else 0.0,
+                "p50": round(percentile(latencies, 50), 1),
+                "p95": round(percentile(latencies, 95), 1),
+                "p99": round(percentile(latencies, 99), 1),
+                "max": round(latencies[-1], 1) if latencies else 0.0,
+            },
+        }
+
+
+async def run_batch(input_path, output, concurrency, graph=None, progress_every=0, recommendation_mode=None):
+    """Run every request in input_path through the graph, writing results to output"""
+    graph = graph or get_compiled_graph()
+    slots = asyncio.Semaphore(concurrency)
+    stats = BatchStats()
+    pending = set()
+
+    async def plan(line_number, request, admitted_at):
+        started = time.perf_counter()
+        record = {"id": request.get("id", line_number), "line": line_number}
+        try:
+            if "_error" in request:
+                raise ValueError(request["_error"])
+            graph_input = request_to_input(request, recommendation_mode)
+            with span("plan", "batch", queue_ms=(started - admitted_at) * 1000):
+                state = await ainvoke_plan(graph, graph_input)
+            record["status"] = "ok"
+            record["result"] = serialize_result(state)
+        except Exception as e:
+            record["status"] = "error"
+            record["error"] = str(e)
+        finally:
+            slots.release()
+
+        latency_ms = (time.perf_counter() - started) * 1000
+        record["latency_ms"] = round(latency_ms, 1)
+        stats.record(latency_ms, record["status"] == "ok")
+        output.write(json.dumps(record) + "\n")
+
+        done = stats.succeeded + stats.failed
+        if progress_every and done % progress_every == 0:
+            print(f"[batch] {done} done, {stats.failed} failed", file=sys.stderr)
+
+    try:
+        for line_number, request in read_requests(input_path):
+            # Block reading the next line until a slot frees up so memory stays bounded
+            waiting_since = time.perf_counter()
+            await slots.acquire()
+            task = asyncio.create_task(plan(line_number, request, waiting_since))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.gather(*pending)
+    finally:
+        output.flush()
+
+    summary = stats.summary()
+    summary["graph"] = get_graph_metrics()
+    summary["query_fast_path"] = get_parser_stats()
+    summary["search_compaction"] = get_compaction_stats()
+    summary["plan_cache"] = get_plan_cache_stats()
+    summary["spans"] = tracer.summary()
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plan events in bulk from a JSONL request file")
+    parser.add_argument("input", help="Path to the JSONL file of planning requests")
+    parser.add_argument("-o", "--output", default="-", help="Output JSONL path (default: stdout)")
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="Maximum plans in flight")
+    parser.add_argument("--summary", help="Optional path to write the run summary as JSON")
+    parser.add_argument("--prewarm-cities",
+                        help="File with one city per line to load into the geocode cache before the run")
+    parser.add_argument("--recommendation-mode", choices=RECOMMENDATION_MODES,
+                        help="Recommendation mode for requests that do not set their own")
+    parser.add_argument("--progress-every", type=int, default=100,
+                        help="Print progress to stderr every N completed requests (0 disables)")
+    args = parser.parse_args(argv)
+
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    try:
+        get_settings()
+    except SettingsError as e:
+        parser.exit(2, f"[batch] invalid configuration: {e}\n")
+
+    configure_tracing()
+
+    if args.prewarm_cities:
+        with open(args.prewarm_cities, 'r') as f:
+            warmed = prewarm_geocode_cache(f)
+        print(f"[batch] geocode cache prewarm: {json.dumps(warmed)}", file=sys.stderr)
+
+    output = sys.stdout if args.output == "-" else open(args.output, 'w')
+    try:
+        summary = asyncio.run(run_batch(args.input, output, args.concurrency,
+                                        progress_every=args.progress_every,
+                                        recommendation_mode=args.recommendation_mode))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+    if args.summary:
+        with open(args.summary, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Micro-benchmark for date_resolver: cold (uncached) resolution, memoized
+resolution and batch resolution of a realistic mix of date phrases.
+
+    python benchmarks/bench_date_resolver.py --batch-size 10000
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import date_resolver  # noqa: E402
+
+PHRASES = [
+    "today", "tomorrow", "this weekend", "next weekend", "next saturday", "friday",
+    "this sunday", "in 3 days", "in 2 weeks", "june 14", "14th of march 2027",
+    "2026-12-24", "next week", "the day after tomorrow", "Next  Saturday",
+]
+
+
+def bench(batch_size, repeat):
+    reference = datetime.date.today()
+    rng = random.Random(0)
+    batch = [rng.choice(PHRASES) for _ in range(batch_size)]
+
+    def cold():
+        date_resolver._resolve.cache_clear()
+        for phrase in PHRASES:
+            date_resolver.resolve_date_range(phrase, reference)
+
+    def warm():
+        for phrase in PHRASES:
+            date_resolver.resolve_date_range(phrase, reference)
+
+    def batched():
+        date_resolver.resolve_dates(batch, reference)
+
+    warm()
+    results = {}
+    for name, func, per_call in (
+        ("cold_per_phrase_us", cold, len(PHRASES)),
+        ("memoized_per_phrase_us", warm, len(PHRASES)),
+        ("batch_per_phrase_us", batched, batch_size),
+    ):
+        best = min(timeit.repeat(func, number=1, repeat=repeat))
+        results[name] = round(best / per_call * 1e6, 3)
+    results["batch_size"] = batch_size
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the relative date resolver")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="Optional path to write results as JSON")
+    args = parser.parse_args(argv)
+
+    results = bench(args.batch_size, args.repeat)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+End-to-end benchmark of the planning graph against the local fakes in
+fake_upstreams.py, so no live services or paid tokens are needed.
+
+Scenarios:
+    single  sequential plans through the sync graph (as the UI runs it), caches cold
+    batch   batch_runner throughput at each --concurrency level, caches cold
+    cache   the same batch run twice: cold caches, then warm
+    api     api_server's /v1/plan over HTTP from --concurrency clients, caches cold
+
+Results are written to benchmarks/results/ (or --output) together with the
+git commit and the latency models used. --compare reports the change against
+an earlier results file and exits non-zero on regressions above --threshold.
+
+    python benchmarks/bench_graph.py --requests 200 --concurrency 8 32
+    python benchmarks/bench_graph.py --compare benchmarks/results/baseline.json
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_upstreams import CITIES, REPO_ROOT, offline_environment  # noqa: E402
+
+# langchain warns on every structured-output client built for gpt-3.5-turbo
+warnings.filterwarnings("ignore", message="Cannot use method='json_schema'")
+
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+SCENARIOS = ("single", "batch", "cache", "api")
+
+EVENTS = ("wedding", "birthday party", "conference", "team offsite", "product launch", "gala", "reunion")
+DATES = ("today", "tomorrow", "this weekend", "next weekend", "next friday", "in 3 days")
+
+# Metrics compared between runs: (path in the scenario result, True if higher is better)
+COMPARED_METRICS = (
+    (("latency_ms", "p50"), False),
+    (("latency_ms", "p95"), False),
+    (("throughput_rps",), True),
+)
+
+
+def make_workload(count, seed=0):
+    """Build a deterministic mix of form, fast-path and LLM-parsed requests"""
+    rng = random.Random(seed)
+    cities = [city.title() for city in CITIES]
+    requests = []
+    for index in range(count):
+        event, city, date = rng.choice(EVENTS), rng.choice(cities), rng.choice(DATES)
+        roll = rng.random()
+        if roll < 0.7:
+            request = {"event_type": event, "location": city, "date": date}
+        elif roll < 0.85:
+            request = {"query": f"Plan a {event} in {city} for {date}"}
+        else:
+            request = {"query": f"Any ideas where our {event} could go? We'll be around {city} {date}."}
+        request["id"] = index
+        requests.append(request)
+    return requests
+
+
+def write_workload(requests):
+    handle, path = tempfile.mkstemp(prefix="planner-bench-", suffix=".jsonl")
+    with os.fdopen(handle, 'w') as f:
+        for request in requests:
+            f.write(json.dumps(request) + "\n")
+    return path
+
+
+def clear_caches():
+    """Empty every memory and on-disk cache the graph consults"""
+    import date_resolver
+    import graph_nodes
+    import plan_cache
+    import utils
+
+    for cache in (utils.get_geocode_cache(), utils.get_forecast_cache(), graph_nodes.get_search_cache(),
+                  graph_nodes.get_venue_cache(), plan_cache.get_plan_cache()):
+        cache.clear()
+    date_resolver._resolve.cache_clear()
+
+
+def _span_digest(summary):
+    return {name: {key: entry[key] for key in ("count", "p50_ms", "p95_ms", "prompt_tokens", "completion_tokens",
+                                               "cache_hits", "cache_misses") if key in entry}
+            for name, entry in sorted(summary.items())}
+
+
+def _begin(environment):
+    from tracing import tracer
+
+    tracer.reset()
+    environment.reset_stats()
+
+
+def _finish(environment, result):
+    from tracing import tracer
+
+    result["upstream_calls"] = environment.upstream_stats()
+    result["spans"] = _span_digest(tracer.summary())
+    return result
+
+
+def run_single(environment, requests):
+    """Plan each request on its own through the sync graph with cold caches"""
+    from batch_runner import BatchStats, request_to_input
+    from graph_builder import get_compiled_graph
+
+    graph = get_compiled_graph()
+    _begin(environment)
+    stats = BatchStats()
+    for request in requests:
+        clear_caches()
+        started = time.perf_counter()
+        try:
+            graph.invoke(request_to_input(request))
+            ok = True
+        except Exception:
+            ok = False
+        stats.record((time.perf_counter() - started) * 1000, ok)
+    return _finish(environment, stats.summary())
+
+
+def run_batch_once(environment, workload_path, concurrency):
+    """Run the workload through batch_runner at the given concurrency"""
+    from batch_runner import run_batch
+
+    _begin(environment)
+    with open(os.devnull, 'w') as output:
+        summary = asyncio.run(run_batch(workload_path, output, concurrency))
+    summary.pop("spans", None)
+    return _finish(environment, summary)
+
+
+async def _post_plans(base_url, requests, concurrency, stats, statuses):
+    import httpx
+
+    pending = iter(requests)
+    async with httpx.AsyncClient(base_url=base_url, timeout=None,
+                                 limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def worker():
+            for request in pending:
+                started = time.perf_counter()
+                try:
+                    response = await client.post("/v1/plan", json=request)
+                    status = response.status_code
+                    ok = status == 200 and response.json().get("status") == "ok"
+                except httpx.HTTPError:
+                    status, ok = "transport_error", False
+                statuses[str(status)] += 1
+                stats.record((time.perf_counter() - started) * 1000, ok)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+def run_api_once(environment, requests, concurrency):
+    """Serve api_server in-process and send the workload to /v1/plan from concurrency clients"""
+    from collections import Counter
+
+    from aiohttp import web
+
+    from api_server import create_app
+    from batch_runner import BatchStats
+
+    async def run():
+        runner = web.AppRunner(create_app())
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = runner.addresses[0][:2]
+        stats, statuses = BatchStats(), Counter()
+        try:
+            await _post_plans(f"http://{host}:{port}", requests, concurrency, stats, statuses)
+        finally:
+            await runner.cleanup()
+        summary = stats.summary()
+        summary["http_status"] = dict(statuses)
+        return summary
+
+    _begin(environment)
+    return _finish(environment, asyncio.run(run()))
+
+
+def run_scenarios(args):
+    results = {}
+    requests = make_workload(args.requests, args.seed)
+    workload_path = write_workload(requests)
+    try:
+        with offline_environment(args.llm_latency, args.weather_latency, args.search_latency,
+                                 args.token_ms, args.seed) as environment:
+            from tracing import configure_tracing
+
+            configure_tracing()
+            if "single" in args.scenarios:
+                print(f"[bench] single: {args.single} sequential plans", file=sys.stderr)
+                results["single"] = run_single(environment, requests[:args.single])
+            if "batch" in args.scenarios:
+                for concurrency in args.concurrency:
+                    print(f"[bench] batch: {args.requests} plans at concurrency {concurrency}", file=sys.stderr)
+                    clear_caches()
+                    results[f"batch@{concurrency}"] = run_batch_once(environment, workload_path, concurrency)
+            if "cache" in args.scenarios:
+                concurrency = max(args.concurrency)
+                print(f"[bench] cache: cold then warm at concurrency {concurrency}", file=sys.stderr)
+                clear_caches()
+                results["cache_cold"] = run_batch_once(environment, workload_path, concurrency)
+                results["cache_warm"] = run_batch_once(environment, workload_path, concurrency)
+            if "api" in args.scenarios:
+                for concurrency in args.concurrency:
+                    print(f"[bench] api: {args.requests} plans over HTTP from {concurrency} clients", file=sys.stderr)
+                    clear_caches()
+                    results[f"api@{concurrency}"] = run_api_once(environment, requests, concurrency)
+    finally:
+        os.remove(workload_path)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _metric(result, path):
+    for key in path:
+        if not isinstance(result, dict) or key not in result:
+            return None
+        result = result[key]
+    return result
+
+
+def compare(previous, current, threshold_pct):
+    """Print per-metric changes and return the list of regressions above threshold_pct"""
+    regressions = []
+    print(f"{'scenario':<14} {'metric':<16} {'before':>10} {'after':>10} {'change':>9}")
+    for scenario in sorted(set(previous["scenarios"]) & set(current["scenarios"])):
+        for path, higher_is_better in COMPARED_METRICS:
+            before = _metric(previous["scenarios"][scenario], path)
+            after = _metric(current["scenarios"][scenario], path)
+            if before is None or after is None:
+                continue
+            change = (after - before) / before * 100 if before else 0.0
+            worse = change < -threshold_pct if higher_is_better else change > threshold_pct
+            name = ".".join(path)
+            flag = "  REGRESSION" if worse else ""
+            print(f"{scenario:<14} {name:<16} {before:>10.1f} {after:>10.1f} {change:>+8.1f}%{flag}")
+            if worse:
+                regressions.append((scenario, name, change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the planning graph against local fake upstreams")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="Plans per batch run")
+    parser.add_argument("--single", type=int, default=20, help="Plans in the single-plan latency scenario")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 32])
+    parser.add_argument("--llm-latency", default="lognormal:400,0.35",
+                        help="Chat completion latency model, e.g. fixed:50, uniform:20,80, lognormal:400,0.35")
+    parser.add_argument("--token-ms", type=float, default=5.0, help="Delay between streamed tokens")
+    parser.add_argument("--weather-latency", default="lognormal:60,0.3")
+    parser.add_argument("--search-latency", default="lognormal:700,0.4")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Results path (default: benchmarks/results/<timestamp>-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Percent change that counts as a regression in --compare")
+    args = parser.parse_args(argv)
+
+    started = datetime.datetime.now()
+    commit = git_commit()
+    report = {
+        "meta": {
+            "timestamp": started.isoformat(timespec="seconds"),
+            "commit": commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "scenarios": run_scenarios(args),
+    }
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{started:%Y%m%d-%H%M%S}-{commit or 'nogit'}.json")
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    for name, result in report["scenarios"].items():
+        latency = result["latency_ms"]
+        print(f"{name:<14} p50 {latency['p50']:>8.1f} ms  p95 {latency['p95']:>8.1f} ms  "
+              f"{result['throughput_rps']:>7.2f} plans/s  ({result['failed']} failed)")
+    print(f"[bench] results written to {output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            previous = json.load(f)
+        if compare(previous, report, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Import-time benchmark: how long a fresh interpreter takes to import each of
+the planner's entry modules, and which heavy dependencies each one drags in.
+
+Every measurement runs in a new subprocess, so nothing is shared through
+sys.modules. Times are the median of --repeat runs, with the bare interpreter
+start-up subtracted. --compare reports the change against an earlier results
+file and exits non-zero on regressions above --threshold.
+
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --compare /tmp/imports-before.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ("settings", "caching", "tracing", "http_client", "utils", "llm_pool", "graph_nodes", "graph_builder",
+           "batch_runner")
+
+# Dependencies that should only load when a plan actually needs them
+HEAVY_MODULES = ("streamlit", "langchain_openai", "langchain_community", "openai", "langgraph", "numpy")
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"ms": elapsed * 1000, "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def _run(code, extra_args=()):
+    return subprocess.run([sys.executable, *extra_args, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True,
+                          check=True)
+
+
+def interpreter_startup_ms(repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        _run("pass")
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def top_imports(module, count):
+    """Return the count slowest imports (cumulative ms) pulled in by module, from -X importtime"""
+    stderr = _run(f"import {module}", ("-X", "importtime")).stderr
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, raw_name = line[len("import time:"):].split("|")
+        name = raw_name.strip()
+        depth = len(raw_name) - len(raw_name.lstrip())
+        if depth == 1:
+            # Children are printed before their parent, so a top-level line closes a group
+            if name == module:
+                break
+            entries = []
+        elif depth == 3:
+            entries.append((name, int(cumulative) / 1000))
+    entries.sort(key=lambda entry: -entry[1])
+    return [{"module": name, "cumulative_ms": round(ms, 1)} for name, ms in entries[:count]]
+
+
+def bench_module(module, repeat, startup_ms):
+    samples, process_samples, loaded = [], [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = json.loads(_run(_PROBE.format(module=module, heavy=HEAVY_MODULES)).stdout)
+        process_samples.append((time.perf_counter() - started) * 1000 - startup_ms)
+        samples.append(result["ms"])
+        loaded = result["loaded"]
+    return {
+        "import_ms": round(statistics.median(samples), 1),
+        "process_ms": round(statistics.median(process_samples), 1),
+        "heavy_modules": loaded,
+        "top_imports": top_imports(module, 5),
+    }
+
+
+def compare(previous, current, threshold_pct):
+    """Print per-module changes and return the modules whose import time regressed above threshold_pct"""
+    regressions = []
+    print(f"{'module':<16} {'before':>10} {'after':>10} {'change':>9}")
+    for module in sorted(set(previous["modules"]) & set(current["modules"])):
+        before = previous["modules"][module]["import_ms"]
+        after = current["modules"][module]["import_ms"]
+        change = (after - before) / before * 100 if before else 0.0
+        worse = change > threshold_pct
+        print(f"{module:<16} {before:>10.1f} {after:>10.1f} {change:>+8.1f}%{'  REGRESSION' if worse else ''}")
+        if worse:
+            regressions.append((module, change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark cold import time of the planner modules")
+    parser.add_argument("--modules", nargs="+", default=list(MODULES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Optional path to write results as JSON")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=20.0,
+                        help="Percent change that counts as a regression in --compare")
+    args = parser.parse_args(argv)
+
+    startup_ms = interpreter_startup_ms(args.repeat)
+    report = {
+        "meta": {"python": sys.version.split()[0], "interpreter_startup_ms": round(startup_ms, 1),
+                 "repeat": args.repeat},
+        "modules": {},
+    }
+    for module in args.modules:
+        result = bench_module(module, args.repeat, startup_ms)
+        report["modules"][module] = result
+        heavy = ", ".join(result["heavy_modules"]) or "-"
+        print(f"{module:<16} import {result['import_ms']:>8.1f} ms  process {result['process_ms']:>8.1f} ms  "
+              f"heavy: {heavy}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            previous = json.load(f)
+        if compare(previous, report, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,427 @@
+"""
+Local stand-ins for the services the planner calls, so the graph can be
+benchmarked offline without paid tokens.
+
+- A chat completions server that answers the structured-output tool calls
+  (QueryAnalysis, VenuesList) and plain/streamed recommendation requests,
+  reporting token usage like the real API.
+- Open-Meteo geocoding and forecast endpoints.
+- FakeSearchRun, a drop-in for DuckDuckGoSearchRun.
+
+Each service takes a latency model such as "fixed:50", "uniform:20,80",
+"normal:400,80" or "lognormal:400,0.35" (milliseconds; lognormal takes the
+median and sigma). offline_environment() starts everything, points a
+temporary working directory's config.json/settings.yaml at the fakes and
+patches the search tool.
+"""
+import asyncio
+import datetime
+import hashlib
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import yaml
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CITIES = {
+    "new york": (40.71, -74.01, "America/New_York"),
+    "london": (51.51, -0.13, "Europe/London"),
+    "paris": (48.85, 2.35, "Europe/Paris"),
+    "berlin": (52.52, 13.41, "Europe/Berlin"),
+    "rome": (41.89, 12.51, "Europe/Rome"),
+    "madrid": (40.42, -3.70, "Europe/Madrid"),
+    "amsterdam": (52.37, 4.89, "Europe/Amsterdam"),
+    "tokyo": (35.69, 139.69, "Asia/Tokyo"),
+    "sydney": (-33.87, 151.21, "Australia/Sydney"),
+    "toronto": (43.70, -79.42, "America/Toronto"),
+    "chicago": (41.85, -87.65, "America/Chicago"),
+    "san francisco": (37.77, -122.42, "America/Los_Angeles"),
+    "austin": (30.27, -97.74, "America/Chicago"),
+    "seattle": (47.61, -122.33, "America/Los_Angeles"),
+    "lisbon": (38.72, -9.13, "Europe/Lisbon"),
+    "dublin": (53.33, -6.25, "Europe/Dublin"),
+}
+
+WEATHER_CODES = (0, 1, 2, 3, 45, 51, 61, 63, 80, 95)
+VENUE_KINDS = ("Hall", "Loft", "Gardens", "Rooftop", "Ballroom", "Gallery", "Terrace", "Pavilion")
+
+
+class LatencyModel:
+    """Sample artificial latency from a named distribution (milliseconds)"""
+
+    DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+
+    def __init__(self, spec="fixed:0", seed=None):
+        kind, _, args = spec.partition(":")
+        if kind not in self.DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution {kind!r}; expected one of {self.DISTRIBUTIONS}")
+        self.spec = spec
+        self.kind = kind
+        self.args = [float(arg) for arg in args.split(",") if arg] or [0.0]
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample_ms(self):
+        with self._lock:
+            if self.kind == "fixed":
+                value = self.args[0]
+            elif self.kind == "uniform":
+                value = self._rng.uniform(self.args[0], self.args[1])
+            elif self.kind == "normal":
+                value = self._rng.gauss(self.args[0], self.args[1])
+            else:
+                value = self._rng.lognormvariate(0, self.args[1]) * self.args[0]
+        return max(0.0, value)
+
+    def sleep(self):
+        time.sleep(self.sample_ms() / 1000)
+
+    async def asleep(self):
+        await asyncio.sleep(self.sample_ms() / 1000)
+
+    def __repr__(self):
+        return f"LatencyModel({self.spec!r})"
+
+
+def _estimate_tokens(text):
+    # Roughly four characters per token, like the real tokenizers on English text
+    return max(1, len(text) // 4)
+
+
+def _stable_rng(text):
+    return random.Random(int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:16], 16))
+
+
+def _find_city(text):
+    lowered = text.lower()
+    for city in CITIES:
+        if city in lowered:
+            return city.title()
+    return None
+
+
+def _query_analysis(prompt):
+    query = prompt.rsplit("User query:", 1)[-1]
+    event = re.search(r"\b(?:a|an|our|my)\s+([a-z]+(?:\s+party)?)", query, re.IGNORECASE)
+    date = re.search(r"\b((?:this|next)\s+\w+|today|tomorrow)\b", query, re.IGNORECASE)
+    return {
+        "location": _find_city(query) or "New York",
+        "date": date.group(1).lower() if date else "this weekend",
+        "event": event.group(1).lower() if event else "event",
+    }
+
+
+def _venues(prompt):
+    rng = _stable_rng(prompt)
+    city = _find_city(prompt.split("Search result:", 1)[-1]) or "the city"
+    return {"venues": [
+        {
+            "name": f"The {rng.choice(VENUE_KINDS)} {index + 1}",
+            "address": f"{rng.randint(1, 400)} Main Street, {city}",
+            "details": f"Capacity {rng.randint(40, 400)}, in-house catering, from ${rng.randint(15, 90)}00",
+            "rating": f"{rng.uniform(3.5, 5):.1f}",
+            "suitability_score": rng.randint(5, 10),
+        }
+        for index in range(5)
+    ]}
+
+
+def _recommendation(prompt):
+    city = _find_city(prompt) or "the city"
+    return (
+        f"Based on the forecast, plan for an indoor option in {city} with a covered outdoor area as a backup. "
+        "Book The Hall 1 first since it scores highest for this event, confirm catering and capacity this week, "
+        "and keep The Loft 2 as an alternative if the weather turns."
+    )
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The stdlib default backlog of 5 refuses connections under benchmark concurrency
+    request_queue_size = 1024
+
+
+class _FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    upstream = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _ChatCompletionsHandler(_FakeHandler):
+
+    def do_POST(self):
+        upstream = self.upstream
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        prompt = "\n".join(str(message.get("content") or "") for message in request.get("messages", []))
+        upstream.count("chat_completions")
+        upstream.latency.sleep()
+
+        tools = request.get("tools") or []
+        if tools:
+            name = tools[0]["function"]["name"]
+            arguments = json.dumps(_venues(prompt) if name == "VenuesList" else _query_analysis(prompt))
+            message = {"role": "assistant", "content": None, "tool_calls": [
+                {"id": "call_0", "type": "function", "function": {"name": name, "arguments": arguments}}
+            ]}
+            completion_text = arguments
+        else:
+            message = {"role": "assistant", "content": _recommendation(prompt)}
+            completion_text = message["content"]
+
+        usage = {"prompt_tokens": _estimate_tokens(prompt), "completion_tokens": _estimate_tokens(completion_text)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        upstream.count("prompt_tokens", usage["prompt_tokens"])
+        upstream.count("completion_tokens", usage["completion_tokens"])
+
+        if request.get("stream"):
+            self._stream(request, message, usage)
+            return
+        self._send_json({
+            "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()),
+            "model": request["model"],
+            "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+            "usage": usage,
+        })
+
+    def _stream(self, request, message, usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def send(choices, **extra):
+            chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": request["model"], "choices": choices, **extra}
+            self.wfile.write(b"data: " + json.dumps(chunk).encode() + b"\n\n")
+            self.wfile.flush()
+
+        if message.get("tool_calls"):
+            call = message["tool_calls"][0]
+            send([{"index": 0, "delta": {"role": "assistant", "tool_calls": [{"index": 0, **call}]},
+                   "finish_reason": None}])
+        else:
+            for word in message["content"].split(" "):
+                send([{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}])
+                time.sleep(self.upstream.token_ms / 1000)
+        send([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if (request.get("stream_options") or {}).get("include_usage"):
+            send([], usage=usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class _OpenMeteoHandler(_FakeHandler):
+
+    def do_GET(self):
+        upstream = self.upstream
+        url = urlsplit(self.path)
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        upstream.latency.sleep()
+
+        if url.path.endswith("/search"):
+            upstream.count("geocode")
+            city = CITIES.get(query.get("name", "").strip().lower())
+            if city is None:
+                self._send_json({"generationtime_ms": 0.1})
+                return
+            latitude, longitude, timezone = city
+            self._send_json({"results": [{"name": query["name"], "latitude": latitude,
+                                          "longitude": longitude, "timezone": timezone}]})
+            return
+
+        upstream.count("forecast")
+        rng = _stable_rng(f"{query.get('latitude')},{query.get('longitude')}")
+        today = datetime.date.today()
+        days = 16
+        self._send_json({"daily": {
+            "time": [(today + datetime.timedelta(days=offset)).isoformat() for offset in range(days)],
+            "weathercode": [rng.choice(WEATHER_CODES) for _ in range(days)],
+            "temperature_2m_max": [round(rng.uniform(12, 30), 1) for _ in range(days)],
+            "temperature_2m_min": [round(rng.uniform(0, 12), 1) for _ in range(days)],
+            "precipitation_probability_max": [rng.randint(0, 100) for _ in range(days)],
+        }})
+
+
+class FakeUpstream:
+    """A fake HTTP service on a background thread with a latency model and call counters"""
+
+    def __init__(self, handler, latency, token_ms=0.0):
+        self.latency = latency
+        self.token_ms = token_ms
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        handler_class = type(handler.__name__, (handler,), {"upstream": self})
+        self.server = _Server(("127.0.0.1", 0), handler_class)
+        self._thread = threading.Thread(target=self.server.serve_forever, name=handler.__name__, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeSearchRun:
+    """Drop-in for DuckDuckGoSearchRun returning a realistic snippet blob"""
+
+    latency = LatencyModel("fixed:0")
+    stats = Counter()
+
+    def run(self, query):
+        FakeSearchRun.stats["searches"] += 1
+        self.latency.sleep()
+        return self._results(query)
+
+    async def ainvoke(self, query):
+        FakeSearchRun.stats["searches"] += 1
+        await self.latency.asleep()
+        return self._results(query)
+
+    def invoke(self, query):
+        return self.run(query)
+
+    @staticmethod
+    def _results(query):
+        rng = _stable_rng(query)
+        city = _find_city(query) or "the city"
+        snippets = []
+        for index in range(8):
+            kind = rng.choice(VENUE_KINDS)
+            snippets.append(
+                f"The {kind} {index + 1} - {city}'s favourite {kind.lower()} for private events, seating up to "
+                f"{rng.randint(40, 400)} guests. Rated {rng.uniform(3.5, 5):.1f}/5 from {rng.randint(20, 900)} "
+                f"reviews. {rng.randint(1, 400)} Main Street."
+            )
+        # Search engines repeat listings and pad results with site boilerplate
+        snippets.extend(rng.sample(snippets, 3))
+        snippets.append("Cookie policy. Sign in to see more results. Privacy Terms Advertise.")
+        # DuckDuckGoSearchRun joins snippet bodies with a single space
+        return " ".join(snippets)
+
+
+def write_workdir(directory, weather_url):
+    """Write config.json and settings.yaml for a run against the fakes"""
+    with open(os.path.join(REPO_ROOT, "settings.yaml"), 'r') as f:
+        settings = yaml.safe_load(f) or {}
+    settings.setdefault("cache", {})["directory"] = os.path.join(directory, ".cache")
+    settings.setdefault("http", {})["max_retries"] = 1
+    settings["tracing"] = {"enabled": True}
+    with open(os.path.join(directory, "settings.yaml"), 'w') as f:
+        yaml.safe_dump(settings, f, sort_keys=False)
+
+    config = {
+        "app": {"title": "EventPro AI Planner (benchmark)", "icon": "🎪", "layout": "wide",
+                "sidebar_state": "expanded"},
+        "api": {
+            "default_model": settings.get("openai", {}).get("default_model", "gpt-3.5-turbo"),
+            "weather": {"geocoding_url": f"{weather_url}/v1/search", "forecast_url": f"{weather_url}/v1/forecast"},
+        },
+        "default_values": {"event": "event", "location": "New York", "date": "this weekend"},
+        "date_options": ["This Weekend", "Next Weekend", "Custom Date"],
+        "limits": {"max_venues": settings.get("limits", {}).get("max_venues", 5)},
+    }
+    with open(os.path.join(directory, "config.json"), 'w') as f:
+        json.dump(config, f, indent=2)
+
+
+class OfflineEnvironment:
+    """Handles to the running fakes, yielded by offline_environment()"""
+
+    def __init__(self, workdir, openai, weather):
+        self.workdir = workdir
+        self.openai = openai
+        self.weather = weather
+
+    def upstream_stats(self):
+        return {
+            "openai": dict(self.openai.stats),
+            "open_meteo": dict(self.weather.stats),
+            "search": dict(FakeSearchRun.stats),
+        }
+
+    def reset_stats(self):
+        self.openai.stats.clear()
+        self.weather.stats.clear()
+        FakeSearchRun.stats.clear()
+
+
+@contextmanager
+def offline_environment(llm_latency="lognormal:400,0.35", weather_latency="lognormal:60,0.3",
+                        search_latency="lognormal:700,0.4", token_ms=5.0, seed=0):
+    """Run the planner against local fakes from a temporary working directory.
+
+    Settings are reloaded from the temporary directory on entry and from the
+    original one on exit.
+    """
+    previous_cwd = os.getcwd()
+    previous_env = {name: os.environ.get(name) for name in ("OPENAI_API_KEY", "OPENAI_BASE_URL", "OPENAI_API_BASE")}
+    workdir = tempfile.mkdtemp(prefix="planner-bench-")
+    openai = FakeUpstream(_ChatCompletionsHandler, LatencyModel(llm_latency, seed), token_ms=token_ms).start()
+    weather = FakeUpstream(_OpenMeteoHandler, LatencyModel(weather_latency, seed)).start()
+    FakeSearchRun.latency = LatencyModel(search_latency, seed)
+    FakeSearchRun.stats.clear()
+
+    try:
+        write_workdir(workdir, weather.url)
+        os.environ["OPENAI_API_KEY"] = "sk-benchmark"
+        os.environ["OPENAI_BASE_URL"] = os.environ["OPENAI_API_BASE"] = f"{openai.url}/v1"
+        os.chdir(workdir)
+        if REPO_ROOT not in sys.path:
+            sys.path.insert(0, REPO_ROOT)
+
+        import settings
+        settings.reset()
+
+        import graph_nodes
+        original_search = graph_nodes.DuckDuckGoSearchRun
+        graph_nodes.DuckDuckGoSearchRun = FakeSearchRun
+        try:
+            yield OfflineEnvironment(workdir, openai, weather)
+        finally:
+            graph_nodes.DuckDuckGoSearchRun = original_search
+    finally:
+        os.chdir(previous_cwd)
+        if "settings" in sys.modules:
+            sys.modules["settings"].reset()
+        for name, value in previous_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        openai.stop()
+        weather.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
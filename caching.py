@@ -0,0 +1,259 @@
+"""
+Caching primitives shared by the planning pipeline: key normalization, a
+thread-safe in-memory LRU with optional TTL, a size-bounded SQLite store, a
+two-tier cache that combines them, and single-flight coalescing of concurrent
+identical lookups.
+"""
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import weakref
+from collections import OrderedDict, Counter
+from concurrent.futures import Future
+
+# Sentinel returned on a cache miss so that falsy values can still be cached
+MISSING = object()
+
+
+def normalize_key(*parts):
+    """Build a stable cache key from free-text parts ("  New  York " == "new york")"""
+    normalized = []
+    for part in parts:
+        text = unicodedata.normalize("NFKC", str(part)).casefold()
+        text = re.sub(r"[^\w,]+", " ", text)
+        text = re.sub(r"\s*,\s*", ", ", text)
+        normalized.append(re.sub(r"\s+", " ", text).strip(" ,"))
+    return "|".join(normalized)
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU cache with an optional per-entry TTL"""
+
+    def __init__(self, max_entries=1024, ttl_seconds=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = Counter()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return MISSING
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def put(self, key, value, ttl_seconds=None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def expires_at(self, key):
+        """Return when key expires (None if it never does), or MISSING when it is absent or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or (entry[1] is not None and entry[1] <= time.time()):
+            return MISSING
+        return entry[1]
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteStore:
+    """Persistent JSON key-value store with TTL expiry and LRU size bounding"""
+
+    def __init__(self, path, table="cache", max_entries=None, ttl_seconds=None):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, stored_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return MISSING
+            value, stored_at = row
+            if self.ttl_seconds and stored_at + self.ttl_seconds <= now:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._conn.commit()
+                return MISSING
+            self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(value)
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            if self.max_entries:
+                # Drop the least recently accessed rows beyond the size cap
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN ("
+                    f"SELECT key FROM {self.table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+class TieredCache:
+    """In-memory LRU in front of an optional persistent SQLite store"""
+
+    def __init__(self, memory_entries=1024, ttl_seconds=None, path=None, table="cache", disk_entries=None):
+        self.memory = LRUCache(memory_entries, ttl_seconds)
+        self.disk = SQLiteStore(path, table, disk_entries, ttl_seconds) if path else None
+        self.stats = Counter()
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not MISSING:
+            self.stats["memory_hits"] += 1
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not MISSING:
+                self.stats["disk_hits"] += 1
+                self.memory.put(key, value)
+                return value
+        self.stats["misses"] += 1
+        return MISSING
+
+    def put(self, key, value):
+        self.memory.put(key, value)
+        if self.disk is not None:
+            self.disk.put(key, value)
+
+    def delete(self, key):
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def snapshot(self):
+        """Return hit/miss counters and sizes for reporting"""
+        stats = dict(self.stats)
+        stats["memory_entries"] = len(self.memory)
+        if self.disk is not None:
+            stats["disk_entries"] = len(self.disk)
+        return stats
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one in-flight execution"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        # Async calls are tracked per event loop since tasks cannot be awaited across loops
+        self._async_calls = weakref.WeakKeyDictionary()
+        self.stats = Counter()
+
+    def do(self, key, fn):
+        """Run fn() for key, or wait for the call already in flight for key"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            self.stats["shared"] += 1
+            return future.result()
+
+        self.stats["executed"] += 1
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def atask(self, key, afn):
+        """Return (task, leader): a new task running afn() for key, or the one already in flight"""
+        loop = asyncio.get_running_loop()
+        calls = self._async_calls.setdefault(loop, {})
+        task = calls.get(key)
+        if task is not None:
+            self.stats["shared"] += 1
+            return task, False
+        self.stats["executed"] += 1
+        task = loop.create_task(afn())
+        calls[key] = task
+        task.add_done_callback(lambda _: calls.pop(key, None))
+        return task, True
+
+    async def ado(self, key, afn):
+        """Await afn() for key, or join the task already in flight for key"""
+        task, _ = self.atask(key, afn)
+        # Shield so one cancelled waiter does not cancel the fetch for everyone else
+        return await asyncio.shield(task)
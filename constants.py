@@ -9,20 +9,37 @@ WEATHER_CODES = {
     51: "Light drizzle",
     53: "Moderate drizzle",
     55: "Dense drizzle",
+    56: "Light freezing drizzle",
+    57: "Dense freezing drizzle",
     61: "Light rain",
     63: "Moderate rain",
     65: "Heavy rain",
+    66: "Light freezing rain",
+    67: "Heavy freezing rain",
     71: "Light snow",
     73: "Moderate snow",
     75: "Heavy snow",
+    77: "Snow grains",
     80: "Rain showers",
     81: "Moderate rain showers",
     82: "Violent rain showers",
+    85: "Light snow showers",
+    86: "Heavy snow showers",
     95: "Thunderstorm",
     96: "Thunderstorm with light hail",
     99: "Thunderstorm with heavy hail"
 }
 
+# Dense lookup table indexed by WMO code (codes run 0-99), built once at import
+WEATHER_DESCRIPTIONS = tuple(WEATHER_CODES.get(code, "Unknown") for code in range(100))
+
+
+def describe_weather_code(code):
+    """Return the description of a WMO weather code, or "Unknown" """
+    if isinstance(code, int) and 0 <= code < len(WEATHER_DESCRIPTIONS):
+        return WEATHER_DESCRIPTIONS[code]
+    return "Unknown"
+
 # CSS styles for the application
 CSS_STYLES = """
 <style>
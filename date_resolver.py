@@ -0,0 +1,168 @@
+"""
+Calendar-aware resolver for the relative date phrases used in event queries.
+
+Phrases resolve to an inclusive DateRange so that "next weekend" covers both
+Saturday and Sunday. Results are memoized per (phrase, reference date).
+resolve_dates() takes a whole batch of phrases, but it is not vectorized: it
+is a loop over the memoized single-phrase resolver that resolves each
+distinct phrase once.
+"""
+import datetime
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+WEEKDAY_INDEX = {name: index for index, name in enumerate(WEEKDAYS)}
+WEEKDAY_INDEX.update({name[:3]: index for index, name in enumerate(WEEKDAYS)})
+
+MONTH_INDEX = {
+    name: index
+    for index, names in enumerate(
+        (("january", "jan"), ("february", "feb"), ("march", "mar"), ("april", "apr"), ("may",),
+         ("june", "jun"), ("july", "jul"), ("august", "aug"), ("september", "sep", "sept"),
+         ("october", "oct"), ("november", "nov"), ("december", "dec")),
+        start=1,
+    )
+    for name in names
+}
+
+_WEEKDAY = "|".join(WEEKDAY_INDEX)
+_MONTH = "|".join(sorted(MONTH_INDEX, key=len, reverse=True))
+
+_ISO = re.compile(r"^(\d{4})-(\d{2})-(\d{2})$")
+_OFFSET = re.compile(r"^in\s+(\d+|a|an|one)\s+(day|week)s?$")
+_WEEKDAY_PHRASE = re.compile(rf"^(?:(this|next|coming)\s+)?({_WEEKDAY})$")
+_WEEK_PHRASE = re.compile(r"^(?:(this|next|coming)\s+)?(?:the\s+)?(weekend|week)$")
+_MONTH_DAY = re.compile(rf"^({_MONTH})\.?\s+(\d{{1,2}})(?:st|nd|rd|th)?(?:,?\s+(\d{{4}}))?$")
+_DAY_MONTH = re.compile(rf"^(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?({_MONTH})\.?(?:,?\s+(\d{{4}}))?$")
+
+
+class UnknownDateError(ValueError):
+    """Raised when a date phrase cannot be resolved"""
+
+
+class DateRange(NamedTuple):
+    start: datetime.date
+    end: datetime.date
+
+    @property
+    def days(self):
+        return (self.end - self.start).days + 1
+
+
+def normalize_phrase(phrase):
+    """Lowercase and collapse whitespace so equivalent phrases share a cache entry"""
+    text = " ".join(str(phrase).lower().replace(",", " , ").split()).replace(" , ", ", ")
+    text = re.sub(r"^(?:on|for)\s+", "", text)
+    return text.strip(" .!?")
+
+
+def _single(day):
+    return DateRange(day, day)
+
+
+def _month_day(reference, month, day, year):
+    """Resolve a month/day pair to its next occurrence on or after reference"""
+    if year:
+        return datetime.date(int(year), month, day)
+    candidate = datetime.date(reference.year, month, day)
+    if candidate < reference:
+        candidate = datetime.date(reference.year + 1, month, day)
+    return candidate
+
+
+@lru_cache(maxsize=4096)
+def _resolve(phrase, reference):
+    today_index = reference.weekday()
+
+    if phrase in ("today", "tonight", "now"):
+        return _single(reference)
+    if phrase == "tomorrow":
+        return _single(reference + datetime.timedelta(days=1))
+    if phrase in ("day after tomorrow", "the day after tomorrow"):
+        return _single(reference + datetime.timedelta(days=2))
+
+    match = _ISO.match(phrase)
+    if match:
+        return _single(datetime.date(*map(int, match.groups())))
+
+    match = _OFFSET.match(phrase)
+    if match:
+        count, unit = match.groups()
+        count = 1 if count in ("a", "an", "one") else int(count)
+        return _single(reference + datetime.timedelta(days=count * (7 if unit == "week" else 1)))
+
+    match = _WEEKDAY_PHRASE.match(phrase)
+    if match:
+        modifier, name = match.groups()
+        days_ahead = (WEEKDAY_INDEX[name] - today_index) % 7
+        # A bare or "next" weekday never means today; "this"/"coming" can
+        if modifier in (None, "next") and days_ahead == 0:
+            days_ahead = 7
+        return _single(reference + datetime.timedelta(days=days_ahead))
+
+    match = _WEEK_PHRASE.match(phrase)
+    if match:
+        modifier, unit = match.groups()
+        if unit == "weekend":
+            if today_index == 6:
+                # On Sunday the current weekend is just today
+                start, end = reference, reference
+            else:
+                start = reference + datetime.timedelta(days=(5 - today_index) % 7)
+                end = start + datetime.timedelta(days=1)
+            if modifier == "next":
+                start = end - datetime.timedelta(days=1) + datetime.timedelta(days=7)
+                end = start + datetime.timedelta(days=1)
+            return DateRange(start, end)
+        # Weeks run Monday to Sunday; "this week" starts today
+        week_end = reference + datetime.timedelta(days=6 - today_index)
+        if modifier == "next":
+            return DateRange(week_end + datetime.timedelta(days=1), week_end + datetime.timedelta(days=7))
+        return DateRange(reference, week_end)
+
+    match = _MONTH_DAY.match(phrase)
+    if match:
+        month, day, year = match.groups()
+        return _single(_month_day(reference, MONTH_INDEX[month], int(day), year))
+
+    match = _DAY_MONTH.match(phrase)
+    if match:
+        day, month, year = match.groups()
+        return _single(_month_day(reference, MONTH_INDEX[month], int(day), year))
+
+    raise UnknownDateError(f"Unrecognized date: {phrase!r}")
+
+
+def resolve_date_range(phrase, reference=None):
+    """Resolve a date phrase to an inclusive DateRange relative to reference (default today)"""
+    reference = reference or datetime.date.today()
+    try:
+        return _resolve(normalize_phrase(phrase), reference)
+    except ValueError as e:
+        # Invalid calendar dates such as "2025-02-30" or "june 31"
+        if isinstance(e, UnknownDateError):
+            raise
+        raise UnknownDateError(f"Invalid date: {phrase!r}") from e
+
+
+def resolve_date(phrase, reference=None):
+    """Resolve a date phrase to the first day it refers to"""
+    return resolve_date_range(phrase, reference).start
+
+
+def resolve_dates(phrases, reference=None):
+    """Resolve a batch of phrases, each distinct one once; unresolvable phrases map to None"""
+    reference = reference or datetime.date.today()
+    resolved = {}
+    results = []
+    for phrase in phrases:
+        key = normalize_phrase(phrase)
+        if key not in resolved:
+            try:
+                resolved[key] = _resolve(key, reference)
+            except ValueError:
+                resolved[key] = None
+        results.append(resolved[key])
+    return results
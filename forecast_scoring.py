@@ -0,0 +1,94 @@
+"""
+Flexible-date scoring of the daily forecast window.
+
+The forecast API returns a whole window of daily data (one entry per day in
+``daily['time']``). score_days() scores every day at once with numpy array
+operations over the weathercode, temperature and precipitation arrays, so
+ranking the window in rank_forecast_window() costs one forecast fetch and no
+extra API calls.
+"""
+import datetime
+
+import numpy as np
+
+from constants import WEATHER_DESCRIPTIONS
+from settings import get_settings
+
+# Score lost per WMO weather code, indexed by code (codes run 0-99)
+_SEVERITY = np.zeros(100)
+for _codes, _penalty in (
+    ((2,), 3), ((3,), 8), ((45, 48), 15),
+    ((51, 53, 55), 20), ((56, 57), 35),
+    ((61,), 30), ((63,), 45), ((65,), 60), ((66, 67), 60),
+    ((71,), 40), ((73,), 55), ((75,), 70), ((77,), 40),
+    ((80,), 35), ((81,), 45), ((82,), 65), ((85,), 45), ((86,), 65),
+    ((95,), 80), ((96, 99), 90),
+):
+    _SEVERITY[list(_codes)] = _penalty
+
+# Score lost per percentage point of precipitation probability
+PRECIPITATION_WEIGHT = 0.4
+# Score lost per degree outside the comfortable range / below the cold night threshold
+TEMPERATURE_WEIGHT = 3.0
+COLD_NIGHT_WEIGHT = 2.0
+
+
+def _column(daily, name, fill):
+    values = daily.get(name) or [fill] * len(daily['time'])
+    return np.array([fill if value is None else value for value in values], dtype=float)
+
+
+def score_days(daily, codes=None):
+    """Return an array with a 0-100 suitability score for every day in the window"""
+    flexible_settings = get_settings().flexible_date
+    low, high = flexible_settings.comfortable_max_temp
+
+    if codes is None:
+        codes = np.clip(_column(daily, 'weathercode', 0).astype(int), 0, len(_SEVERITY) - 1)
+    max_temps = _column(daily, 'temperature_2m_max', (low + high) / 2)
+    min_temps = _column(daily, 'temperature_2m_min', flexible_settings.cold_min_temp)
+    precipitation = _column(daily, 'precipitation_probability_max', 0)
+
+    scores = 100.0 - _SEVERITY[codes] - PRECIPITATION_WEIGHT * precipitation
+    scores -= TEMPERATURE_WEIGHT * (np.maximum(low - max_temps, 0) + np.maximum(max_temps - high, 0))
+    scores -= COLD_NIGHT_WEIGHT * np.maximum(flexible_settings.cold_min_temp - min_temps, 0)
+    return np.clip(scores, 0, 100)
+
+
+def rank_forecast_window(daily, date_range=None, top_days=None):
+    """Rank the days of a daily forecast, best first.
+
+    Only days inside date_range (a date_resolver.DateRange) are considered when
+    it is given. Returns up to top_days dicts shaped like the single-day weather
+    report plus a score.
+    """
+    top_days = top_days or get_settings().flexible_date.top_days
+    dates = np.array(daily['time'])
+    if len(dates) == 0:
+        return []
+    codes = np.clip(_column(daily, 'weathercode', 0).astype(int), 0, len(_SEVERITY) - 1)
+    scores = score_days(daily, codes)
+
+    eligible = np.ones(len(dates), dtype=bool)
+    if date_range is not None:
+        # ISO dates compare correctly as strings
+        eligible = (dates >= date_range.start.isoformat()) & (dates <= date_range.end.isoformat())
+    indices = np.flatnonzero(eligible)
+    # Stable sort keeps earlier days first among equal scores
+    ranked = indices[np.argsort(-scores[indices], kind="stable")][:top_days]
+
+    days = []
+    for index in ranked:
+        day = datetime.date.fromisoformat(str(dates[index]))
+        code = int(codes[index])
+        days.append({
+            "date": day.isoformat(),
+            "day_name": day.strftime("%A"),
+            "score": round(float(scores[index]), 1),
+            "description": WEATHER_DESCRIPTIONS[code],
+            "max_temp": daily['temperature_2m_max'][index],
+            "min_temp": daily['temperature_2m_min'][index],
+            "precipitation_probability": daily.get('precipitation_probability_max', [0] * len(dates))[index],
+            "weather_code": code,
+        })
+    return days
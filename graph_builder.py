@@ -1,14 +1,48 @@
+import threading
+import time
+
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, START, END
 
+from settings import get_settings
+from tracing import traced_node
 from models import ParentState
 from graph_nodes import (
     query_analyzer,
+    aquery_analyzer,
     weather_fetcher,
+    aweather_fetcher,
     event_planning_assistant,
+    aevent_planning_assistant,
     venues_list_formatter,
-    recommendation_analyzer
+    avenues_list_formatter,
+    recommendation_analyzer,
+    arecommendation_analyzer
 )
-from utils import both_paths_complete
+
+# Process-wide registry of compiled graphs, keyed by config fingerprint
+_compiled_graphs = {}
+_registry_lock = threading.Lock()
+_registry_metrics = {
+    "builds": 0,
+    "hits": 0,
+    "last_build_seconds": 0.0,
+    "total_build_seconds": 0.0,
+    "config_hash": None,
+}
+
+
+def route_entry(state):
+    """Skip query analysis when the caller already supplied event, location and date"""
+    if state.get("event") and state.get("location") and state.get("date"):
+        return ["weather_fetcher", "event_planning_assistant"]
+    return "query_analyzer"
+
+
+def _node(name, func, afunc):
+    """Pair a sync node with its async variant so the graph supports invoke and ainvoke"""
+    func, afunc = traced_node(name, func, afunc)
+    return RunnableLambda(func, afunc=afunc, name=name)
 
 
 def build_event_planning_graph():
@@ -18,36 +52,65 @@ def build_event_planning_graph():
     parent_builder = StateGraph(ParentState)
 
     # Add nodes for each step in the process
-    parent_builder.add_node("query_analyzer", query_analyzer)
-    parent_builder.add_node("weather_fetcher", weather_fetcher)
-    parent_builder.add_node("event_planning_assistant", event_planning_assistant)
-    parent_builder.add_node("venues_list_formatter", venues_list_formatter)
-    parent_builder.add_node("recommendation_analyzer", recommendation_analyzer)
-
-    # Connect the nodes
-    parent_builder.add_edge(START, "query_analyzer")
+    parent_builder.add_node("query_analyzer", _node("query_analyzer", query_analyzer, aquery_analyzer))
+    parent_builder.add_node("weather_fetcher", _node("weather_fetcher", weather_fetcher, aweather_fetcher))
+    parent_builder.add_node("event_planning_assistant",
+                            _node("event_planning_assistant", event_planning_assistant, aevent_planning_assistant))
+    parent_builder.add_node("venues_list_formatter",
+                            _node("venues_list_formatter", venues_list_formatter, avenues_list_formatter))
+    parent_builder.add_node("recommendation_analyzer",
+                            _node("recommendation_analyzer", recommendation_analyzer, arecommendation_analyzer))
+
+    # Connect the nodes; structured input skips straight to the parallel branches
+    parent_builder.add_conditional_edges(
+        START,
+        route_entry,
+        ["query_analyzer", "weather_fetcher", "event_planning_assistant"]
+    )
     parent_builder.add_edge("query_analyzer", "weather_fetcher")
     parent_builder.add_edge("query_analyzer", "event_planning_assistant")
     parent_builder.add_edge("event_planning_assistant", "venues_list_formatter")
 
-    # Use conditional routing to ensure both paths complete
-    parent_builder.add_conditional_edges(
-        "weather_fetcher",
-        lambda state: "recommendation_analyzer" if both_paths_complete(state) else "__wait__"
-    )
+    # Fan-in barrier: recommendation_analyzer runs once, after both branches finish
+    parent_builder.add_edge(["weather_fetcher", "venues_list_formatter"], "recommendation_analyzer")
 
-    parent_builder.add_conditional_edges(
-        "venues_list_formatter",
-        lambda state: "recommendation_analyzer" if both_paths_complete(state) else "__wait__"
-    )
+    parent_builder.add_edge("recommendation_analyzer", END)
 
-    # Add a special "wait" node that routes back to itself until both conditions are met
-    parent_builder.add_node("__wait__", lambda state: state)
-    parent_builder.add_conditional_edges(
-        "__wait__",
-        lambda state: "recommendation_analyzer" if both_paths_complete(state) else "__wait__"
-    )
+    return parent_builder.compile()
+
+
+def config_fingerprint():
+    """Return the fingerprint of the settings the graph is built from"""
+    return get_settings().fingerprint
+
+
+def get_compiled_graph():
+    """Return the shared compiled graph, rebuilding it only when the config changes"""
+    key = config_fingerprint()
+    graph = _compiled_graphs.get(key)
+    if graph is not None:
+        _registry_metrics["hits"] += 1
+        return graph
+
+    with _registry_lock:
+        graph = _compiled_graphs.get(key)
+        if graph is not None:
+            _registry_metrics["hits"] += 1
+            return graph
+
+        started = time.perf_counter()
+        graph = build_event_planning_graph()
+        elapsed = time.perf_counter() - started
+
+        _compiled_graphs.clear()
+        _compiled_graphs[key] = graph
+        _registry_metrics["builds"] += 1
+        _registry_metrics["last_build_seconds"] = elapsed
+        _registry_metrics["total_build_seconds"] += elapsed
+        _registry_metrics["config_hash"] = key
+        return graph
 
-    parent_builder.add_edge("recommendation_analyzer", END)
 
-    return parent_builder.compile()
\ No newline at end of file
+def get_graph_metrics():
+    """Return a snapshot of the compiled graph registry metrics"""
+    return dict(_registry_metrics)
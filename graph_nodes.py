@@ -1,31 +1,61 @@
 import os
 import json
-from langchain_openai import ChatOpenAI
-from langchain_community.tools import DuckDuckGoSearchRun
-from langchain_core.messages import HumanMessage
+import hashlib
+import threading
 
+import tracing
+from caching import MISSING, SingleFlight, TieredCache, normalize_key
+from llm_pool import get_chat_model, get_structured_llm
 from models import QueryAnalysis, VenuesList, EventVenue
-from utils import fetch_weather, load_constants, load_config
+from prompt_compaction import compact_search_result, encode_venue_digest
+from query_parser import parse_event_query
+from rule_engine import build_recommendation, resolve_mode
+from settings import get_settings
+from utils import (fetch_weather, afetch_weather, fetch_best_days, afetch_best_days,
+                   get_cache_settings)
 
-# Get configuration
-config = load_config()
-constants = load_constants()
-weather_codes = constants.get("WEATHER_CODES", {})
+# Search tool class, imported with the first search (see _search_tool)
+DuckDuckGoSearchRun = None
 
+_cache_lock = threading.Lock()
+_search_cache = None
+_search_flight = SingleFlight()
+_venue_cache = None
 
-def query_analyzer(state):
-    """Extract location, date, and event type from user query"""
-    messages = state['messages']
-    user_query = messages[-1].content
 
+def _chat_model():
+    """Return the pooled chat model used by the LLM-backed nodes"""
     # Get API key from environment
     api_key = os.getenv("OPENAI_API_KEY", "")
+    return get_chat_model(get_settings().api.default_model, api_key)
+
+
+def _structured_llm(schema):
+    """Return the pooled structured-output runnable for schema"""
+    api_key = os.getenv("OPENAI_API_KEY", "")
+    return get_structured_llm(schema, get_settings().api.default_model, api_key)
 
-    try:
-        # Initialize LLM with API key
-        llm = ChatOpenAI(model=config["api"]["default_model"], api_key=api_key)
 
-        prompt = f"""
+def _search_tool():
+    """Return a DuckDuckGo search tool, importing langchain_community on first use"""
+    global DuckDuckGoSearchRun
+    if DuckDuckGoSearchRun is None:
+        from langchain_community.tools import DuckDuckGoSearchRun as search_tool_class
+        DuckDuckGoSearchRun = search_tool_class
+    return DuckDuckGoSearchRun()
+
+
+def _default_analysis():
+    default_values = get_settings().default_values
+    return {
+        "location": default_values.location,
+        "date": default_values.date,
+        "event": default_values.event
+    }
+
+
+def _query_analysis_prompt(user_query):
+    return f"""
 Extract the following information from the user query:
 - location: the city or place name
 - date: the day of the week, including any modifiers like 'next' or 'this' (e.g., 'next Sunday', 'this Friday', 'this weekend', 'next weekend', or just 'Sunday')
@@ -35,50 +65,50 @@ Handle special date formats like 'weekend', 'this weekend', 'next weekend' appro
 
 User query: {user_query}
 """
-        try:
-            structured_llm = llm.with_structured_output(QueryAnalysis)
-            analysis = structured_llm.invoke(prompt)
-            return {"location": analysis.location, "date": analysis.date, "event": analysis.event}
-        except Exception as e:
-            # Fallback to manual extraction if structured format fails
-            try:
-                # Default emergency values
-                event = config["default_values"]["event"]
-                location = config["default_values"]["location"]
-                date = config["default_values"]["date"]
-
-                # Try to extract from the query
-                if "in" in user_query and "for" in user_query:
-                    parts = user_query.split("in")
-                    if len(parts) > 1:
-                        event_part = parts[0].strip().lower()
-                        if "plan" in event_part:
-                            event = event_part.split("plan")[-1].strip()
-                        elif "an" in event_part:
-                            event = event_part.split("an")[-1].strip()
-                        elif "a" in event_part:
-                            event = event_part.split("a")[-1].strip()
-
-                        location_date_part = parts[1].strip()
-                        if "for" in location_date_part:
-                            loc_parts = location_date_part.split("for")
-                            location = loc_parts[0].strip()
-                            date = loc_parts[1].strip()
-
-                return {"location": location, "date": date, "event": event}
-            except:
-                # Ultimate fallback
-                return {
-                    "location": config["default_values"]["location"],
-                    "date": config["default_values"]["date"],
-                    "event": config["default_values"]["event"]
-                }
-    except Exception as e:
-        return {
-            "location": config["default_values"]["location"],
-            "date": config["default_values"]["date"],
-            "event": config["default_values"]["event"]
-        }
+
+
+def _fallback_query_analysis(user_query):
+    """Lenient grammar extraction used when the structured LLM call fails"""
+    analysis = _default_analysis()
+    parsed = parse_event_query(user_query, lenient=True)
+    if parsed:
+        analysis.update({key: value for key, value in parsed.items() if value})
+    return analysis
+
+
+def query_analyzer(state):
+    """Extract location, date, and event type from user query"""
+    user_query = state['messages'][-1].content
+
+    # Form-built and common phrasings are parsed without an LLM round-trip
+    parsed = parse_event_query(user_query)
+    if parsed:
+        return parsed
+
+    try:
+        structured_llm = _structured_llm(QueryAnalysis)
+        analysis = structured_llm.invoke(_query_analysis_prompt(user_query))
+        return {"location": analysis.location, "date": analysis.date, "event": analysis.event}
+    except Exception:
+        # Fallback to manual extraction if structured format fails
+        return _fallback_query_analysis(user_query)
+
+
+async def aquery_analyzer(state):
+    """Async variant of query_analyzer"""
+    user_query = state['messages'][-1].content
+
+    parsed = parse_event_query(user_query)
+    if parsed:
+        return parsed
+
+    try:
+        structured_llm = _structured_llm(QueryAnalysis)
+        analysis = await structured_llm.ainvoke(_query_analysis_prompt(user_query))
+        return {"location": analysis.location, "date": analysis.date, "event": analysis.event}
+    except Exception:
+        # Fallback to manual extraction if structured format fails
+        return _fallback_query_analysis(user_query)
 
 
 def weather_fetcher(state):
@@ -86,37 +116,125 @@ def weather_fetcher(state):
     location = state['location']
     date_str = state['date']
 
-    weather_report, weather_ready = fetch_weather(location, date_str, weather_codes)
+    if state.get('flexible_date'):
+        weather_report, ranked_days = fetch_best_days(location, date_str)
+        return {"weather_report": weather_report, "ranked_days": ranked_days, "weather_ready": True}
+
+    weather_report, weather_ready = fetch_weather(location, date_str)
+    return {"weather_report": weather_report, "weather_ready": weather_ready}
+
+
+async def aweather_fetcher(state):
+    """Async variant of weather_fetcher"""
+    location = state['location']
+    date_str = state['date']
+
+    if state.get('flexible_date'):
+        weather_report, ranked_days = await afetch_best_days(location, date_str)
+        return {"weather_report": weather_report, "ranked_days": ranked_days, "weather_ready": True}
+
+    weather_report, weather_ready = await afetch_weather(location, date_str)
     return {"weather_report": weather_report, "weather_ready": weather_ready}
 
 
+def _venue_search_query(state):
+    return f"best venues for {state['event']} in {state['location']} with reviews and ratings"
+
+
+def get_search_cache():
+    """Return the shared venue search cache keyed by normalized (event, location)"""
+    global _search_cache
+    if _search_cache is None:
+        with _cache_lock:
+            if _search_cache is None:
+                directory, search_settings = get_cache_settings("search")
+                path = os.path.join(directory, "search.sqlite3") if search_settings.persistent else None
+                _search_cache = TieredCache(
+                    memory_entries=search_settings.memory_entries,
+                    ttl_seconds=search_settings.ttl_seconds,
+                    path=path,
+                    table="search",
+                    disk_entries=search_settings.disk_entries,
+                )
+    return _search_cache
+
+
+def _search_key(state):
+    return normalize_key(state['event'], state['location'])
+
+
+# What DuckDuckGoSearchRun returns when the search engine has nothing
+_NO_RESULTS = "No good DuckDuckGo Search Result was found"
+
+
+def _has_results(result):
+    return bool(result and result.strip()) and not result.strip().startswith(_NO_RESULTS)
+
+
+def _search_update(result):
+    # An empty search is not cached, and neither is a plan built on it
+    return {"search_result": result} if _has_results(result) else {"search_result": result, "degraded": True}
+
+
 def event_planning_assistant(state):
     """Search for venues based on event type and location"""
-    location = state['location']
-    event = state['event']
-    query = f"best venues for {event} in {location} with reviews and ratings"
+    cache = get_search_cache()
+    key = _search_key(state)
+    search_result = cache.get(key)
+    tracing.record_cache("search", search_result is not MISSING)
+    if search_result is not MISSING:
+        return {"search_result": search_result}
+
+    def search():
+        with tracing.span("search", "duckduckgo"):
+            result = _search_tool().run(_venue_search_query(state))
+            tracing.record_bytes(len(result.encode("utf-8")))
+        if _has_results(result):
+            cache.put(key, result)
+        return result
 
     try:
-        search_tool = DuckDuckGoSearchRun()
-        search_result = search_tool.run(query)
+        return _search_update(_search_flight.do(key, search))
+    except Exception as e:
+        return {"search_result": f"Error searching for venues: {str(e)}", "degraded": True}
+
+
+async def aevent_planning_assistant(state):
+    """Async variant of event_planning_assistant"""
+    cache = get_search_cache()
+    key = _search_key(state)
+    search_result = cache.get(key)
+    tracing.record_cache("search", search_result is not MISSING)
+    if search_result is not MISSING:
         return {"search_result": search_result}
+
+    async def search():
+        with tracing.span("search", "duckduckgo"):
+            result = await _search_tool().ainvoke(_venue_search_query(state))
+            tracing.record_bytes(len(result.encode("utf-8")))
+        if _has_results(result):
+            cache.put(key, result)
+        return result
+
+    try:
+        return _search_update(await _search_flight.ado(key, search))
     except Exception as e:
-        return {"search_result": f"Error searching for venues: {str(e)}"}
+        return {"search_result": f"Error searching for venues: {str(e)}", "degraded": True}
 
 
-def venues_list_formatter(state):
-    """Format venue search results into structured data"""
-    # Get API key from environment
-    api_key = os.getenv("OPENAI_API_KEY", "")
+def _compact_search(state):
+    """Bound the search blob fed to venue extraction and record the tokens saved"""
+    compacted = compact_search_result(state['search_result'], state['event'], state['location'],
+                                      get_settings().api.default_model)
+    tracing.annotate(search_tokens_before=compacted.tokens_before, search_tokens_after=compacted.tokens_after)
+    return compacted.text
 
-    # Initialize LLM with API key
-    llm = ChatOpenAI(model=config["api"]["default_model"], api_key=api_key)
 
-    search_result = state['search_result']
+def _venues_prompt(state, search_result):
     event_type = state['event']
 
-    prompt = f"""
-Extract a list of venues from the following search result for a {event_type} event. 
+    return f"""
+Extract a list of venues from the following search result for a {event_type} event.
 For each venue, provide:
 1. Name
 2. Address
@@ -126,37 +244,116 @@ For each venue, provide:
 
 Search result: {search_result}
 
-Limit to the {config.get('limits', {}).get('max_venues', 5)} most relevant venues.
+Limit to the {get_settings().limits.max_venues} most relevant venues.
 """
+
+
+def _fallback_venues():
+    # Fallback in case of error
+    dummy_venue = EventVenue(
+        name="Sample Venue",
+        address="123 Main St, City",
+        details="No venue details available due to processing error",
+        rating="N/A",
+        suitability_score=5
+    )
+    return {"venues": [dummy_venue], "venues_ready": True, "degraded": True}
+
+
+def get_venue_cache():
+    """Return the shared content-addressed cache of extracted venue lists"""
+    global _venue_cache
+    if _venue_cache is None:
+        with _cache_lock:
+            if _venue_cache is None:
+                directory, venue_settings = get_cache_settings("venues")
+                path = os.path.join(directory, "venues.sqlite3") if venue_settings.persistent else None
+                _venue_cache = TieredCache(
+                    memory_entries=venue_settings.memory_entries,
+                    path=path,
+                    table="venues",
+                    disk_entries=venue_settings.disk_entries,
+                )
+    return _venue_cache
+
+
+def _venue_cache_key(state, search_result):
+    """Hash everything that determines the extraction output"""
+    current = get_settings()
+    parts = (
+        search_result,
+        normalize_key(state['event']),
+        normalize_key(state['location']),
+        current.api.default_model,
+        str(current.limits.max_venues),
+    )
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def _cached_venues(key):
+    cached = get_venue_cache().get(key)
+    tracing.record_cache("venues", cached is not MISSING)
+    if cached is MISSING:
+        return None
+    return {"venues": [EventVenue.model_validate(venue) for venue in cached], "venues_ready": True}
+
+
+def _store_venues(state, key, search_result, venues):
+    # Venues extracted from an empty or failed search are not worth keeping
+    if state.get('degraded') or not search_result.strip():
+        return
+    get_venue_cache().put(key, [venue.model_dump() for venue in venues])
+
+
+def venues_list_formatter(state):
+    """Format venue search results into structured data"""
+    search_result = _compact_search(state)
+    key = _venue_cache_key(state, search_result)
+    cached = _cached_venues(key)
+    if cached is not None:
+        return cached
+
     try:
-        structured_llm = llm.with_structured_output(VenuesList)
-        result = structured_llm.invoke(prompt)
+        structured_llm = _structured_llm(VenuesList)
+        result = structured_llm.invoke(_venues_prompt(state, search_result))
+        _store_venues(state, key, search_result, result.venues)
         return {"venues": result.venues, "venues_ready": True}
-    except Exception as e:
-        # Fallback in case of error
-        dummy_venue = EventVenue(
-            name="Sample Venue",
-            address="123 Main St, City",
-            details="No venue details available due to processing error",
-            rating="N/A",
-            suitability_score=5
-        )
-        return {"venues": [dummy_venue], "venues_ready": True}
+    except Exception:
+        return _fallback_venues()
 
 
-def recommendation_analyzer(state):
-    """Generate comprehensive event recommendations"""
-    # Get API key from environment
-    api_key = os.getenv("OPENAI_API_KEY", "")
+async def avenues_list_formatter(state):
+    """Async variant of venues_list_formatter"""
+    search_result = _compact_search(state)
+    key = _venue_cache_key(state, search_result)
+    cached = _cached_venues(key)
+    if cached is not None:
+        return cached
 
-    # Initialize LLM with API key
-    llm = ChatOpenAI(model=config["api"]["default_model"], api_key=api_key)
+    try:
+        structured_llm = _structured_llm(VenuesList)
+        result = await structured_llm.ainvoke(_venues_prompt(state, search_result))
+        _store_venues(state, key, search_result, result.venues)
+        return {"venues": result.venues, "venues_ready": True}
+    except Exception:
+        return _fallback_venues()
+
+
+def _venue_digest(state):
+    """Encode the venues for the recommendation prompt and record the tokens saved"""
+    digest = encode_venue_digest(state['venues'], get_settings().api.default_model)
+    tracing.annotate(venue_tokens_before=digest.tokens_before, venue_tokens_after=digest.tokens_after)
+    return digest.text
 
+
+def _recommendation_prompt(state):
     weather_data = state['weather_report']
-    venues = state['venues']
+    venues = _venue_digest(state)
     event_type = state['event']
     location = state['location']
     date_str = state['date']
+    requirements = state.get('requirements')
+    requirements_line = f"\n6. Special Requirements: {requirements}" if requirements else ""
 
     try:
         weather_report = json.loads(weather_data)
@@ -166,16 +363,24 @@ Weather for {weather_report['day_name']} ({weather_report['date']}) in {weather_
 - Temperature: {weather_report['min_temp']}°C to {weather_report['max_temp']}°C
 - Precipitation probability: {weather_report['precipitation_probability']}%
 """
-    except:
+    except Exception:
         weather_description = weather_data
 
-    prompt = f"""
+    ranked_days = state.get('ranked_days')
+    if ranked_days:
+        # Flexible date: the weather above is for the best day; offer the runners-up too
+        weather_description += "- Best days in the forecast window: " + ", ".join(
+            f"{day['day_name']} {day['date']} (score {day['score']})" for day in ranked_days
+        ) + "\n"
+
+    return f"""
 You are an expert event planner. Based on:
 1. Weather: {weather_description}
 2. Event Type: {event_type}
-3. Location: {location} 
+3. Location: {location}
 4. Date: {date_str}
-5. Available Venues: {venues}
+5. Available Venues:
+{venues}{requirements_line}
 
 Provide a comprehensive recommendation including:
 1. Whether the event should be indoors or outdoors given the weather
@@ -186,22 +391,52 @@ Provide a comprehensive recommendation including:
 
 Format your response in a professional, elegant way suitable for an event planning service.
 """
-    try:
-        result = llm.invoke(prompt)
-        return {"recommendation": result.content}
-    except Exception as e:
-        # Fallback recommendation in case of error
-        return {
-            "recommendation": f"""
+
+
+def _fallback_recommendation(state):
+    # Fallback recommendation in case of error
+    return {
+        "recommendation": f"""
 # Event Planning Recommendation
 
 Due to a technical issue, we could not generate a detailed recommendation.
 
 ## Basic Recommendation
 - Consider indoor venues if the weather forecast shows rain or extreme temperatures
-- Choose a venue that specializes in {event_type} events
+- Choose a venue that specializes in {state['event']} events
 - Have a backup plan in case of unexpected issues
 
 Please try again later for more detailed recommendations.
-"""
-        }
\ No newline at end of file
+""",
+        "degraded": True,
+    }
+
+
+def _rule_recommendation(state):
+    """Build the recommendation from the weather report and venue scores without the LLM"""
+    recommendation = build_recommendation(state['event'], state['location'], state['weather_report'],
+                                          state['venues'], state.get('requirements', ''), state.get('ranked_days'))
+    tracing.annotate(recommendation_mode="rules")
+    return {"recommendation": recommendation}
+
+
+def recommendation_analyzer(state):
+    """Generate comprehensive event recommendations"""
+    if resolve_mode(state.get('recommendation_mode')) == "rules":
+        return _rule_recommendation(state)
+    try:
+        result = _chat_model().invoke(_recommendation_prompt(state))
+        return {"recommendation": result.content}
+    except Exception:
+        return _fallback_recommendation(state)
+
+
+async def arecommendation_analyzer(state):
+    """Async variant of recommendation_analyzer"""
+    if resolve_mode(state.get('recommendation_mode')) == "rules":
+        return _rule_recommendation(state)
+    try:
+        result = await _chat_model().ainvoke(_recommendation_prompt(state))
+        return {"recommendation": result.content}
+    except Exception:
+        return _fallback_recommendation(state)
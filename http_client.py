@@ -0,0 +1,158 @@
+"""
+Shared HTTP layer for the weather endpoints: pooled keep-alive connections,
+connect/read timeouts, bounded retries with jittered exponential backoff and a
+per-host connection limit, for both requests (sync) and httpx (async).
+"""
+import asyncio
+import random
+import threading
+import time
+import weakref
+from collections import Counter
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+import tracing
+from settings import get_settings
+
+# Responses worth retrying; anything else is returned to the caller as-is
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+_lock = threading.Lock()
+_stats = Counter()
+_session = None
+# One httpx.AsyncClient (plus per-host semaphores) per event loop
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_http_settings():
+    """Return the http section of the settings"""
+    return get_settings().http
+
+
+def _count(key):
+    with _lock:
+        _stats[key] += 1
+
+
+def _backoff_delay(attempt, retry_after=None):
+    """Full-jitter exponential backoff, honouring a numeric Retry-After header"""
+    http_settings = get_http_settings()
+    ceiling = http_settings.backoff_max_seconds
+    if retry_after:
+        try:
+            return min(float(retry_after), ceiling)
+        except ValueError:
+            pass
+    return random.uniform(0, min(ceiling, http_settings.backoff_base_seconds * (2 ** attempt)))
+
+
+def get_session():
+    """Return the shared keep-alive requests.Session"""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                per_host = get_http_settings().max_connections_per_host
+                session = requests.Session()
+                # pool_block makes callers wait for a free connection instead of opening extras
+                adapter = HTTPAdapter(pool_connections=16, pool_maxsize=per_host, pool_block=True)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def get(url, params=None):
+    """GET url with timeouts and bounded retries on connection errors and 429/5xx"""
+    http_settings = get_http_settings()
+    timeout = (http_settings.connect_timeout_seconds, http_settings.read_timeout_seconds)
+    max_retries = http_settings.max_retries
+    session = get_session()
+
+    with tracing.span("http", urlsplit(url).netloc) as http_span:
+        for attempt in range(max_retries + 1):
+            _count("requests")
+            try:
+                response = session.get(url, params=params, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                _count("errors")
+                if attempt == max_retries:
+                    raise
+                _count("retries")
+                time.sleep(_backoff_delay(attempt))
+                continue
+
+            tracing.record_bytes(len(response.content))
+            if response.status_code in RETRY_STATUS_CODES and attempt < max_retries:
+                _count("retries")
+                time.sleep(_backoff_delay(attempt, response.headers.get("Retry-After")))
+                continue
+            if http_span is not None:
+                http_span.attrs.update(status=response.status_code, attempts=attempt + 1)
+            return response
+
+
+def get_async_client():
+    """Return the shared (httpx.AsyncClient, host semaphores) pair for the running loop"""
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(loop)
+    if entry is None:
+        http_settings = get_http_settings()
+        timeout = httpx.Timeout(http_settings.read_timeout_seconds,
+                                connect=http_settings.connect_timeout_seconds)
+        entry = (httpx.AsyncClient(timeout=timeout), {})
+        _async_clients[loop] = entry
+    return entry
+
+
+def _host_slot(semaphores, url):
+    host = urlsplit(url).netloc
+    semaphore = semaphores.get(host)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(get_http_settings().max_connections_per_host)
+        semaphores[host] = semaphore
+    return semaphore
+
+
+async def aget(url, params=None):
+    """Async variant of get"""
+    client, semaphores = get_async_client()
+    max_retries = get_http_settings().max_retries
+
+    with tracing.span("http", urlsplit(url).netloc) as http_span:
+        for attempt in range(max_retries + 1):
+            _count("requests")
+            try:
+                slot = _host_slot(semaphores, url)
+                waiting_since = time.perf_counter()
+                async with slot:
+                    if http_span is not None:
+                        # Time spent waiting for a per-host connection slot
+                        http_span.queue_ms += (time.perf_counter() - waiting_since) * 1000
+                    response = await client.get(url, params=params)
+            except (httpx.TransportError, httpx.TimeoutException):
+                _count("errors")
+                if attempt == max_retries:
+                    raise
+                _count("retries")
+                await asyncio.sleep(_backoff_delay(attempt))
+                continue
+
+            tracing.record_bytes(len(response.content))
+            if response.status_code in RETRY_STATUS_CODES and attempt < max_retries:
+                _count("retries")
+                await asyncio.sleep(_backoff_delay(attempt, response.headers.get("Retry-After")))
+                continue
+            if http_span is not None:
+                http_span.attrs.update(status=response.status_code, attempts=attempt + 1)
+            return response
+
+
+def get_http_stats():
+    """Return request, retry and error counters for the weather HTTP layer"""
+    with _lock:
+        return dict(_stats)
@@ -0,0 +1,148 @@
+"""
+Shared pool of ChatOpenAI clients and structured-output runnables.
+
+Clients are keyed by (model, api_key) and reuse keep-alive HTTP connection
+pools, so repeated node calls skip client construction, TLS handshakes and
+structured-output schema conversion.
+"""
+import asyncio
+import threading
+import weakref
+from collections import Counter
+
+import httpx
+from settings import get_settings
+from tracing import get_token_usage_callback
+
+_lock = threading.Lock()
+_stats = Counter()
+
+# Sync callers share one set of clients; async callers get one per event loop
+# because httpx async pools are bound to the loop that created them.
+_sync_entries = {}
+_loop_entries = weakref.WeakKeyDictionary()
+_sync_http_client = None
+
+
+def _pool_limits():
+    pool_settings = get_settings().openai.pool
+    return httpx.Limits(
+        max_connections=pool_settings.max_connections,
+        max_keepalive_connections=pool_settings.max_keepalive_connections,
+        keepalive_expiry=pool_settings.keepalive_expiry_seconds,
+    )
+
+
+def _count(key, amount=1):
+    with _lock:
+        _stats[key] += amount
+
+
+def _trace(event_name, info):
+    if event_name == "connection.connect_tcp.complete":
+        _count("new_connections")
+
+
+async def _atrace(event_name, info):
+    _trace(event_name, info)
+
+
+def _on_request(request):
+    _count("http_requests")
+    request.extensions["trace"] = _trace
+
+
+async def _aon_request(request):
+    _count("http_requests")
+    request.extensions["trace"] = _atrace
+
+
+def _get_sync_http_client():
+    # Only called while holding _lock
+    global _sync_http_client
+    if _sync_http_client is None:
+        _sync_http_client = httpx.Client(limits=_pool_limits(), event_hooks={"request": [_on_request]})
+    return _sync_http_client
+
+
+def _current_entries():
+    """Return the (entries, async_client) pair for the calling context"""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return _sync_entries, None
+
+    pool = _loop_entries.get(loop)
+    if pool is None:
+        client = httpx.AsyncClient(limits=_pool_limits(), event_hooks={"request": [_aon_request]})
+        pool = ({}, client)
+        _loop_entries[loop] = pool
+    return pool
+
+
+def get_chat_model(model, api_key):
+    """Return a pooled ChatOpenAI client for model and api_key"""
+    entries, async_client = _current_entries()
+    key = (model, api_key)
+    llm = entries.get(key)
+    if llm is not None:
+        _count("client_hits")
+        return llm
+
+    with _lock:
+        llm = entries.get(key)
+        if llm is None:
+            # langchain_openai takes about a second to import; load it with the first client
+            from langchain_openai import ChatOpenAI
+
+            llm = ChatOpenAI(
+                model=model,
+                api_key=api_key,
+                timeout=get_settings().openai.timeout_seconds,
+                # Report token usage on streamed responses too, for tracing
+                stream_usage=True,
+                callbacks=[get_token_usage_callback()],
+                http_client=_get_sync_http_client(),
+                http_async_client=async_client,
+            )
+            entries[key] = llm
+            _stats["client_misses"] += 1
+            return llm
+    _count("client_hits")
+    return llm
+
+
+def get_structured_llm(schema, model, api_key):
+    """Return a cached with_structured_output runnable for schema on a pooled client"""
+    entries, _ = _current_entries()
+    key = (model, api_key, schema)
+    runnable = entries.get(key)
+    if runnable is not None:
+        _count("structured_hits")
+        return runnable
+
+    llm = get_chat_model(model, api_key)
+    with _lock:
+        runnable = entries.get(key)
+        if runnable is None:
+            runnable = llm.with_structured_output(schema)
+            entries[key] = runnable
+            _stats["structured_misses"] += 1
+            return runnable
+    _count("structured_hits")
+    return runnable
+
+
+def get_pool_stats():
+    """Return client cache hit/miss and HTTP connection reuse counters"""
+    with _lock:
+        stats = {
+            "client_hits": _stats["client_hits"],
+            "client_misses": _stats["client_misses"],
+            "structured_hits": _stats["structured_hits"],
+            "structured_misses": _stats["structured_misses"],
+            "http_requests": _stats["http_requests"],
+            "new_connections": _stats["new_connections"],
+        }
+    stats["reused_connections"] = max(0, stats["http_requests"] - stats["new_connections"])
+    return stats
@@ -1,13 +1,15 @@
 import os
+import time
 import datetime
 import streamlit as st
 import json
-from langchain_core.messages import HumanMessage
 
 # Import local modules
 from constants import CSS_STYLES, SIDEBAR_HELP
-from utils import load_config
-from graph_builder import build_event_planning_graph
+from utils import build_structured_input
+from settings import SettingsError, get_settings
+from plan_cache import lookup, prepare, replay_updates, store
+from tracing import configure_tracing
 from templates import (
     get_about_content,
     get_event_details_card,
@@ -23,15 +25,22 @@ try:
 except ImportError:
     pass
 
-# Load configuration
-config = load_config()
+# Load and validate configuration
+try:
+    settings = get_settings()
+except SettingsError as e:
+    st.error(f"Invalid configuration: {e}")
+    st.stop()
+
+# Exporters and the metrics endpoint are set up once per process
+configure_tracing()
 
 # Set page config
 st.set_page_config(
-    page_title=config["app"]["title"],
-    page_icon=config["app"]["icon"],
-    layout=config["app"]["layout"],
-    initial_sidebar_state=config["app"]["sidebar_state"]
+    page_title=settings.app.title,
+    page_icon=settings.app.icon,
+    layout=settings.app.layout,
+    initial_sidebar_state=settings.app.sidebar_state
 )
 
 # Apply custom CSS
@@ -59,7 +68,7 @@ with st.sidebar:
     st.markdown("\n".join(SIDEBAR_HELP["examples"]))
 
 # Streamlit UI
-st.markdown(f'<h1 class="main-header">{config["app"]["title"]}</h1>', unsafe_allow_html=True)
+st.markdown(f'<h1 class="main-header">{settings.app.title}</h1>', unsafe_allow_html=True)
 st.markdown('<p style="text-align: center; font-size: 1.2rem;">Your professional event planning assistant</p>',
             unsafe_allow_html=True)
 
@@ -76,7 +85,7 @@ with tab1:
             location = st.text_input("Location", placeholder="City or Place")
 
         with col2:
-            date_options = config["date_options"]
+            date_options = list(settings.date_options)
             date_selection = st.selectbox("When is your event?", date_options)
 
             if date_selection == "Custom Date":
@@ -85,14 +94,13 @@ with tab1:
             else:
                 date_str = date_selection.lower()
 
+            flexible_date = st.checkbox("My date is flexible (suggest the best days in the forecast)")
+
         # Query field (optional)
         additional_requirements = st.text_area("Additional Requirements (Optional)",
                                                placeholder="e.g., needs catering, accessible facilities, outdoor space...")
 
-        # Create full query for the AI
-        query = f"Plan a {event_type} in {location} for {date_str}"
-        if additional_requirements:
-            query += f". Requirements: {additional_requirements}"
+        quick_plan = st.checkbox("Quick plan (rule-based recommendation from the forecast and venue scores)")
 
         # Submit button
         submit_button = st.form_submit_button("Plan My Event")
@@ -106,44 +114,105 @@ with tab1:
         elif not event_type or not location or not date_str:
             st.error("⚠️ Please fill out all required fields")
         else:
-            with st.spinner("Planning your event... This may take a moment"):
-                try:
-                    # Initialize the graph
-                    parent_graph = build_event_planning_graph()
-
-                    # Run the graph
-                    result = parent_graph.invoke({
-                        "messages": [HumanMessage(content=query)]
-                    })
-
-                    # Display Results in a structured format
-                    st.success("✅ Event planned successfully!")
-
-                    # Create columns
-                    col1, col2 = st.columns([1, 1])
-
-                    with col1:
-                        st.markdown('<h2 class="sub-header">Event Details</h2>', unsafe_allow_html=True)
-                        st.markdown(get_event_details_card(event_type, location, date_str), unsafe_allow_html=True)
-
-                        # Weather information
-                        st.markdown('<h2 class="sub-header">Weather Forecast</h2>', unsafe_allow_html=True)
-                        st.markdown(get_weather_card(result['weather_report']), unsafe_allow_html=True)
-
-                    with col2:
-                        # Venues information
-                        st.markdown('<h2 class="sub-header">Recommended Venues</h2>', unsafe_allow_html=True)
-                        for venue in result['venues'][:3]:  # Show top 3 venues
-                            st.markdown(get_venue_card(venue), unsafe_allow_html=True)
-
-                    # AI Recommendation
-                    st.markdown('<h2 class="sub-header">AI Recommendation</h2>', unsafe_allow_html=True)
-                    st.markdown(get_recommendation_box(result['recommendation']), unsafe_allow_html=True)
-
-                except Exception as e:
-                    st.error(f"Error processing your request: {str(e)}")
-                    if "API key" in str(e):
-                        st.warning("Please check your OpenAI API key in the sidebar")
+            status = st.empty()
+            status.info("⏳ Planning your event... results will appear as they arrive")
+            try:
+                # Imported on first submit so the form renders before langgraph and langchain load
+                from graph_builder import get_compiled_graph
+
+                # Reuse the process-wide compiled graph
+                parent_graph = get_compiled_graph()
+
+                # Lay out placeholders up front so each section renders as soon as its node finishes
+                col1, col2 = st.columns([1, 1])
+
+                with col1:
+                    st.markdown('<h2 class="sub-header">Event Details</h2>', unsafe_allow_html=True)
+                    st.markdown(get_event_details_card(event_type, location, date_str), unsafe_allow_html=True)
+
+                    # Weather information
+                    st.markdown('<h2 class="sub-header">Weather Forecast</h2>', unsafe_allow_html=True)
+                    weather_placeholder = st.empty()
+
+                with col2:
+                    # Venues information
+                    st.markdown('<h2 class="sub-header">Recommended Venues</h2>', unsafe_allow_html=True)
+                    venues_placeholder = st.empty()
+
+                # AI Recommendation
+                st.markdown('<h2 class="sub-header">AI Recommendation</h2>', unsafe_allow_html=True)
+                recommendation_placeholder = st.empty()
+
+                started = time.perf_counter()
+                first_content_seconds = None
+                recommendation_text = ""
+
+                # Run the graph with the form fields, streaming node updates and LLM tokens;
+                # an identical earlier plan is replayed from the plan cache instead
+                plan_key, graph_input = prepare(
+                    build_structured_input(event_type, location, date_str, additional_requirements,
+                                           "rules" if quick_plan else None, flexible_date)
+                )
+                cached_plan = lookup(plan_key) if plan_key is not None else None
+                if cached_plan is not None:
+                    chunks = replay_updates(cached_plan)
+                else:
+                    chunks = parent_graph.stream(graph_input, stream_mode=["updates", "messages"])
+                final_state = dict(graph_input)
+                for mode, chunk in chunks:
+                    rendered = False
+                    if mode == "messages":
+                        message, metadata = chunk
+                        if metadata.get("langgraph_node") == "recommendation_analyzer" and message.content:
+                            recommendation_text += message.content
+                            recommendation_placeholder.markdown(get_recommendation_box(recommendation_text),
+                                                                unsafe_allow_html=True)
+                            rendered = True
+                    else:
+                        for node, update in chunk.items():
+                            if not update:
+                                continue
+                            final_state.update(update)
+                            if node == "weather_fetcher":
+                                weather_html = get_weather_card(update['weather_report'])
+                                if update.get('ranked_days'):
+                                    weather_html += "<p><strong>Best days:</strong> " + ", ".join(
+                                        f"{day['day_name']} {day['date']} ({day['score']:.0f}/100)"
+                                        for day in update['ranked_days']
+                                    ) + "</p>"
+                                weather_placeholder.markdown(weather_html, unsafe_allow_html=True)
+                                rendered = True
+                            elif node == "venues_list_formatter":
+                                # Show top 3 venues
+                                venues_placeholder.markdown(
+                                    "".join(get_venue_card(venue) for venue in update['venues'][:3]),
+                                    unsafe_allow_html=True
+                                )
+                                rendered = True
+                            elif node == "recommendation_analyzer":
+                                # Final text, also covers fallbacks that never streamed tokens
+                                recommendation_placeholder.markdown(get_recommendation_box(update['recommendation']),
+                                                                    unsafe_allow_html=True)
+                                rendered = True
+
+                    if rendered and first_content_seconds is None:
+                        first_content_seconds = time.perf_counter() - started
+
+                total_seconds = time.perf_counter() - started
+                if plan_key is not None and cached_plan is None:
+                    store(plan_key, final_state)
+                st.session_state.setdefault("plan_timings", []).append(
+                    {"time_to_first_content": first_content_seconds, "total": total_seconds}
+                )
+                status.success("✅ Event planned successfully!")
+                if first_content_seconds is not None:
+                    st.caption(f"First content in {first_content_seconds:.2f}s · completed in {total_seconds:.2f}s")
+
+            except Exception as e:
+                status.empty()
+                st.error(f"Error processing your request: {str(e)}")
+                if "API key" in str(e):
+                    st.warning("Please check your OpenAI API key in the sidebar")
 
 with tab2:
     st.markdown(get_about_content())
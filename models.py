@@ -1,3 +1,4 @@
+import operator
 from typing import TypedDict, Annotated, List
 from pydantic import BaseModel, Field
 from langgraph.graph.message import add_messages
@@ -17,6 +18,13 @@ class ParentState(TypedDict):
     location: str
     date: str
     event: str
+    # Free-text requirements supplied alongside structured form input
+    requirements: str
+    # "llm" (default) or "rules" for the deterministic recommendation
+    recommendation_mode: str
+    # Rank the days in the forecast window instead of using the requested date alone
+    flexible_date: bool
+    ranked_days: list
     weather_report: str
     search_result: str
     venues: List[EventVenue]
@@ -24,6 +32,8 @@ class ParentState(TypedDict):
     # Add flags to track completion of parallel paths
     weather_ready: bool
     venues_ready: bool
+    # Set by any node that fell back after an error; such plans are not cached
+    degraded: Annotated[bool, operator.or_]
 
 
 # Analysis model for extracting query information
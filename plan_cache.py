@@ -0,0 +1,213 @@
+"""
+Plan-level result cache in front of the compiled graph.
+
+A request is fingerprinted on its normalized event, location and
+requirements, the calendar date its date phrase resolves to today, the
+recommendation mode and the settings fingerprint. "Next  Friday" and "next
+friday" share an entry, but "tomorrow" stops matching at midnight. Free-text
+queries are cached when the fast-path parser understands them; they then
+enter the graph as structured input, exactly as query_analyzer would have
+produced it. Other queries always run the whole graph.
+
+A stored plan expires together with the forecast it was built on, and plans
+that went through a fallback (marked degraded) are not stored. Concurrent
+identical requests share one graph run, streamed or not: the first streamed
+request sees the run's own updates and tokens, and the others get the
+finished plan replayed as updates.
+"""
+import asyncio
+import datetime
+import hashlib
+import threading
+import time
+from collections import Counter
+
+import tracing
+import utils
+from caching import MISSING, LRUCache, SingleFlight, normalize_key
+from date_resolver import UnknownDateError, resolve_date
+import query_parser
+from rule_engine import resolve_mode
+from settings import get_settings
+
+# Final state keys stored for a plan
+PLAN_KEYS = ("event", "location", "date", "requirements", "weather_report", "ranked_days", "venues",
+             "recommendation")
+
+_cache_lock = threading.Lock()
+_plan_cache = None
+_plan_flight = SingleFlight()
+_stats_lock = threading.Lock()
+_stats = Counter()
+
+
+def _count(key):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def get_plan_cache():
+    """Return the shared in-memory cache of finished plans"""
+    global _plan_cache
+    if _plan_cache is None:
+        with _cache_lock:
+            if _plan_cache is None:
+                _, plan_settings = utils.get_cache_settings("plans")
+                _plan_cache = LRUCache(max_entries=plan_settings.memory_entries,
+                                       ttl_seconds=plan_settings.ttl_seconds)
+    return _plan_cache
+
+
+def prepare(graph_input):
+    """Return (fingerprint, graph input), with fingerprint None when the plan cannot be cached"""
+    if not graph_input.get("event"):
+        messages = graph_input.get("messages") or []
+        # Not counted here: on a miss query_analyzer parses the query again and records the attempt
+        parsed = query_parser.parse_event_query(messages[-1].content, record_stats=False) if messages else None
+        if not parsed:
+            return None, graph_input
+        # The graph skips query_analyzer for this input, so its fast-path hit is recorded here
+        query_parser.record_attempt(hit=True)
+        # Same fields query_analyzer's fast path returns, so the graph can skip it
+        graph_input = {**graph_input, **parsed}
+
+    date_str = graph_input.get("date") or ""
+    flexible_date = bool(graph_input.get("flexible_date"))
+    if flexible_date:
+        # The forecast window moves with today
+        resolved = f"{datetime.date.today().isoformat()}~{date_str}"
+    else:
+        try:
+            resolved = resolve_date(date_str).isoformat()
+        except UnknownDateError:
+            return None, graph_input
+
+    parts = normalize_key(graph_input.get("event", ""), graph_input.get("location", ""),
+                          graph_input.get("requirements", ""), resolved)
+    parts += f"|{resolve_mode(graph_input.get('recommendation_mode'))}|{flexible_date}|{get_settings().fingerprint}"
+    return hashlib.sha256(parts.encode("utf-8")).hexdigest(), graph_input
+
+
+def lookup(key):
+    """Return the stored plan for key, or None"""
+    bundle = get_plan_cache().get(key)
+    tracing.record_cache("plan", bundle is not MISSING)
+    _count("hits" if bundle is not MISSING else "misses")
+    return None if bundle is MISSING else dict(bundle)
+
+
+def _ttl(state):
+    """Seconds a finished plan stays fresh (0: until evicted), or None when it should not be stored"""
+    if state.get("degraded"):
+        return None
+    forecast_expires_at = utils.forecast_expires_at(state.get("location", ""))
+    if forecast_expires_at is MISSING:
+        # The forecast fetch failed, so the weather part of the plan is an error message
+        return None
+    ttl = get_plan_cache().ttl_seconds
+    if forecast_expires_at is not None:
+        remaining = forecast_expires_at - time.time()
+        ttl = remaining if ttl is None else min(ttl, remaining)
+    if ttl is None:
+        return 0
+    return ttl if ttl > 0 else None
+
+
+def store(key, state):
+    """Store a finished plan under key if it is cacheable"""
+    ttl = _ttl(state)
+    if ttl is None:
+        _count("not_stored")
+        return
+    bundle = {name: state[name] for name in PLAN_KEYS if name in state}
+    get_plan_cache().put(key, bundle, ttl_seconds=ttl)
+    _count("stored")
+
+
+async def ainvoke_plan(graph, graph_input):
+    """Run graph_input through the graph unless an identical plan is cached or already running"""
+    key, graph_input = prepare(graph_input)
+    if key is None:
+        _count("uncacheable")
+        return await graph.ainvoke(graph_input)
+    cached = lookup(key)
+    if cached is not None:
+        return cached
+
+    async def run():
+        # Another caller may have stored the plan while we waited to lead
+        bundle = get_plan_cache().get(key)
+        if bundle is not MISSING:
+            return dict(bundle)
+        state = await graph.ainvoke(graph_input)
+        store(key, state)
+        return state
+
+    return await _plan_flight.ado(key, run)
+
+
+async def astream_plan(graph, key, graph_input):
+    """Yield the ("updates" | "messages", chunk) pairs of graph.astream for a prepared input.
+
+    A cached plan, or one an identical request is already running, is replayed
+    as updates instead of running the graph again.
+    """
+    stream_mode = ["updates", "messages"]
+    if key is None:
+        _count("uncacheable")
+        async for item in graph.astream(graph_input, stream_mode=stream_mode):
+            yield item
+        return
+    cached = lookup(key)
+    if cached is not None:
+        for item in replay_updates(cached):
+            yield item
+        return
+
+    chunks = asyncio.Queue()
+
+    async def run():
+        try:
+            # Another caller may have stored the plan while we waited to lead
+            bundle = get_plan_cache().get(key)
+            if bundle is not MISSING:
+                return dict(bundle)
+            state = dict(graph_input)
+            async for mode, chunk in graph.astream(graph_input, stream_mode=stream_mode):
+                chunks.put_nowait((mode, chunk))
+                if mode == "updates":
+                    for update in chunk.values():
+                        state.update(update or {})
+            store(key, state)
+            return state
+        finally:
+            chunks.put_nowait(None)
+
+    # The run is not tied to this request, so it still finishes for the others if this client leaves
+    task, leader = _plan_flight.atask(key, run)
+    streamed = False
+    if leader:
+        while (item := await chunks.get()) is not None:
+            streamed = True
+            yield item
+    state = await asyncio.shield(task)
+    if not streamed:
+        for item in replay_updates(state):
+            yield item
+
+
+def replay_updates(bundle):
+    """Yield a stored plan as the ("updates", {node: update}) chunks graph.stream produces"""
+    yield "updates", {"weather_fetcher": {key: bundle[key] for key in ("weather_report", "ranked_days")
+                                          if key in bundle}}
+    yield "updates", {"venues_list_formatter": {"venues": bundle.get("venues", [])}}
+    yield "updates", {"recommendation_analyzer": {"recommendation": bundle.get("recommendation", "")}}
+
+
+def get_plan_cache_stats():
+    """Return plan cache hits, misses, stores and runs shared between identical requests"""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["shared"] = _plan_flight.stats["shared"]
+    stats["entries"] = len(get_plan_cache())
+    return stats
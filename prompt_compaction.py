@@ -0,0 +1,240 @@
+"""
+Prompt compaction for the LLM-backed graph nodes.
+
+For venue extraction, the raw DuckDuckGo blob (snippets joined with spaces)
+is split into sentences, deduplicated, stripped of site boilerplate sentences, ranked by how much each passage
+looks like a venue listing and cut to a token budget measured with the
+model's tokenizer. For the recommendation, venues are encoded as a compact
+table instead of their pydantic reprs, so prompt size grows predictably with
+venue count.
+"""
+import re
+import threading
+from collections import Counter
+from functools import lru_cache
+from typing import NamedTuple
+
+from settings import get_settings
+
+# Passages that carry no venue information
+_BOILERPLATE = re.compile(
+    r"""cookie|privacy\s+(?:policy|terms)|terms\s+of\s+(?:use|service)|sign\s+(?:in|up)|log\s+in
+      |subscribe|advertis|all\s+rights\s+reserved|javascript|your\s+browser|see\s+more\s+results
+      |missing:|must\s+include""",
+    re.IGNORECASE | re.VERBOSE,
+)
+
+# Ellipses, or whitespace after a sentence end that is followed by a capital or digit
+_PASSAGE_SPLIT = re.compile(r"\s*(?:\.{3}|…)\s*|(?<=[.!?])\s+(?=[\"'(]?[A-Z0-9])")
+# A period after these is not a sentence end ("The St. Regis", "J. Smith Hall")
+_ABBREVIATION = re.compile(
+    r"(?:\b(?:[Ss]t|[Mm]t|[Ff]t|[Dd]r|[Mm]rs?|[Mm]s|[Jj]r|[Ss]r|[Aa]ve|[Rr]d|[Bb]lvd|[Nn]o|[Ii]nc|[Ll]td|[Cc]o|vs|approx)"
+    r"|(?<![\w.])[A-Z])\.$"
+)
+
+_VENUE_TERMS = re.compile(
+    r"""\b(?:venues?|halls?|ballrooms?|hotels?|restaurants?|banquet|gardens?|rooftops?|lofts?|galler(?:y|ies)
+      |terraces?|pavilions?|barns?|estates?|wineries|winery|manors?|clubs?|lounges?|museums?|rooms?|spaces?)\b""",
+    re.IGNORECASE | re.VERBOSE,
+)
+_DETAIL_TERMS = re.compile(
+    r"\b(?:capacity|guests?|seats?|seating|catering|private|events?|parking|accessible|outdoor|indoor)\b",
+    re.IGNORECASE,
+)
+_RATING = re.compile(r"\b[1-5](?:\.\d)?\s*(?:/\s*5|stars?|out\s+of\s+5)|\b(?:rated|ratings?|reviews?)\b",
+                     re.IGNORECASE)
+_ADDRESS = re.compile(r"\b\d{1,5}\s+\w+(?:\s+\w+)?\s+(?:st|street|ave|avenue|rd|road|blvd|lane|ln|way|square|sq)\b",
+                      re.IGNORECASE)
+_PRICE = re.compile(r"[$€£]\s?\d|\b\d+\s?(?:usd|eur|gbp)\b", re.IGNORECASE)
+
+MIN_PASSAGE_CHARS = 20
+
+_lock = threading.Lock()
+_stats = {}
+
+
+class CompactionResult(NamedTuple):
+    text: str
+    tokens_before: int
+    tokens_after: int
+    passages_before: int
+    passages_kept: int
+
+    @property
+    def tokens_saved(self):
+        return self.tokens_before - self.tokens_after
+
+
+def _record(stage, tokens_before, tokens_after):
+    with _lock:
+        stats = _stats.setdefault(stage, Counter())
+        stats["calls"] += 1
+        stats["tokens_before"] += tokens_before
+        stats["tokens_after"] += tokens_after
+
+
+@lru_cache(maxsize=8)
+def _encoding(model):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        pass
+    except Exception:
+        # The BPE files are downloaded on first use and may be unavailable offline
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text, model="gpt-3.5-turbo"):
+    """Count tokens with the model's tokenizer, or estimate when tiktoken is unavailable"""
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text, token_budget, model="gpt-3.5-turbo"):
+    """Cut text to at most token_budget tokens"""
+    encoding = _encoding(model)
+    if encoding is None:
+        return text[:token_budget * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    return text if len(tokens) <= token_budget else encoding.decode(tokens[:token_budget])
+
+
+def _normalize(passage):
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", passage.lower()).split())
+
+
+def split_passages(text):
+    """Split a search blob into trimmed snippets and sentences"""
+    text = text or ""
+    pieces, start = [], 0
+    for boundary in _PASSAGE_SPLIT.finditer(text):
+        if boundary.group().isspace() and _ABBREVIATION.search(text, start, boundary.start()):
+            continue
+        pieces.append(text[start:boundary.start()])
+        start = boundary.end()
+    pieces.append(text[start:])
+    passages = (passage.strip(" .-|·") for passage in pieces)
+    return [passage for passage in passages if passage]
+
+
+def dedupe_passages(passages):
+    """Drop boilerplate, fragments and passages already covered by an earlier one"""
+    kept, seen = [], []
+    for passage in passages:
+        if _BOILERPLATE.search(passage):
+            continue
+        if len(passage) < MIN_PASSAGE_CHARS and not _ADDRESS.search(passage):
+            continue
+        normalized = _normalize(passage)
+        if not normalized or any(normalized in other for other in seen):
+            continue
+        # A longer passage supersedes the shorter ones it contains
+        for index in [index for index, other in enumerate(seen) if other in normalized]:
+            kept[index] = None
+            seen[index] = ""
+        kept.append(passage)
+        seen.append(normalized)
+    return [passage for passage in kept if passage is not None]
+
+
+def venue_score(passage, terms=()):
+    """Score how much a passage reads like a venue listing"""
+    score = 3 * len(_VENUE_TERMS.findall(passage))
+    score += len(_DETAIL_TERMS.findall(passage))
+    score += 2 * bool(_RATING.search(passage)) + 2 * bool(_ADDRESS.search(passage)) + bool(_PRICE.search(passage))
+    lowered = passage.lower()
+    score += sum(2 for term in terms if term and term in lowered)
+    return score
+
+
+def compact_search_result(search_result, event="", location="", model="gpt-3.5-turbo", token_budget=None):
+    """Reduce a search blob to its most venue-like passages within token_budget"""
+    current = get_settings()
+    tokens_before = count_tokens(search_result or "", model)
+    if not current.search_compaction.enabled:
+        return CompactionResult(search_result, tokens_before, tokens_before, 0, 0)
+
+    token_budget = token_budget or current.search_compaction.token_budget
+    passages = split_passages(search_result)[:current.limits.max_search_results]
+    candidates = dedupe_passages(passages)
+
+    terms = [part for part in (event or "").lower().split() + [(location or "").lower()] if len(part) > 2]
+    ranked = sorted(range(len(candidates)), key=lambda index: -venue_score(candidates[index], terms))
+
+    selected, used = set(), 0
+    for index in ranked:
+        cost = count_tokens(candidates[index], model) + 1
+        if used + cost > token_budget:
+            continue
+        selected.add(index)
+        used += cost
+
+    if selected:
+        # Keep the original order so names stay next to their ratings and addresses
+        text = "\n".join(candidates[index] for index in sorted(selected))
+    elif candidates:
+        # Even the best passage is over budget on its own
+        text = truncate_tokens(candidates[ranked[0]], token_budget, model)
+        selected.add(ranked[0])
+    else:
+        # Nothing looked usable; the extraction prompt still gets the start of the original
+        text = truncate_tokens((search_result or "").strip(), token_budget, model)
+    result = CompactionResult(text, tokens_before, count_tokens(text, model), len(passages), len(selected))
+    _record("search", result.tokens_before, result.tokens_after)
+    return result
+
+
+def _cell(value, limit=None):
+    text = " ".join(str(value).replace("|", "/").split())
+    if limit and len(text) > limit:
+        text = text[:limit - 1].rstrip() + "…"
+    return text
+
+
+def encode_venue_digest(venues, model="gpt-3.5-turbo"):
+    """Encode venues as a compact table, best suited first, dropping poor matches.
+
+    Venues scoring below min_suitability are left out unless none would remain,
+    in which case the single best venue is kept. Details are capped at
+    max_detail_chars. Returns a CompactionResult whose tokens_before counts the
+    plain repr of the venue list that the prompt used to embed.
+    """
+    digest_settings = get_settings().venue_digest
+    venues = list(venues or [])
+    tokens_before = count_tokens(str(venues), model)
+    if not digest_settings.enabled:
+        return CompactionResult(str(venues), tokens_before, tokens_before, len(venues), len(venues))
+
+    ranked = sorted(venues, key=lambda venue: -venue.suitability_score)
+    kept = [venue for venue in ranked if venue.suitability_score >= digest_settings.min_suitability]
+    kept = kept or ranked[:1]
+
+    lines = ["name | rating | fit | address | details"]
+    lines.extend(
+        " | ".join((_cell(venue.name), _cell(venue.rating), f"{venue.suitability_score}/10", _cell(venue.address),
+                    _cell(venue.details, digest_settings.max_detail_chars)))
+        for venue in kept
+    )
+    text = "\n".join(lines) if kept else "none found"
+    result = CompactionResult(text, tokens_before, count_tokens(text, model), len(venues), len(kept))
+    _record("venues", result.tokens_before, result.tokens_after)
+    return result
+
+
+def get_compaction_stats():
+    """Return per-stage totals of tokens before/after compaction and tokens saved"""
+    with _lock:
+        snapshot = {stage: dict(stats) for stage, stats in _stats.items()}
+    for stats in snapshot.values():
+        stats["tokens_saved"] = stats["tokens_before"] - stats["tokens_after"]
+    return snapshot
@@ -0,0 +1,131 @@
+"""
+Deterministic fast-path parser for event planning queries.
+
+Handles the query template built by the Streamlit form
+("Plan a {event} in {location} for {date}") and common free-text phrasings
+with precompiled regular expressions, so query_analyzer only needs the LLM
+when the grammar is not confident.
+"""
+import re
+import threading
+from collections import Counter
+
+WEEKDAYS = "monday|tuesday|wednesday|thursday|friday|saturday|sunday"
+MONTHS = ("january|february|march|april|may|june|july|august|september|october|november|december"
+          "|jan|feb|mar|apr|jun|jul|aug|sep|sept|oct|nov|dec")
+
+# Date phrases the planner knows how to resolve
+DATE_GRAMMAR = rf"""
+    today | tonight | (?:the\s+)?day\s+after\s+tomorrow | tomorrow
+  | (?:this|next|coming)\s+(?:{WEEKDAYS}|weekend|week)
+  | (?:the\s+)?weekend
+  | (?:on\s+)?(?:{WEEKDAYS})
+  | \d{{4}}-\d{{2}}-\d{{2}}
+  | in\s+(?:\d+|a|an|one)\s+(?:days?|weeks?)
+  | (?:{MONTHS})\.?\s+\d{{1,2}}(?:st|nd|rd|th)?(?:,?\s+\d{{4}})?
+  | \d{{1,2}}(?:st|nd|rd|th)?\s+(?:of\s+)?(?:{MONTHS})(?:,?\s+\d{{4}})?
+"""
+
+# Leading filler before the event type ("Plan a", "I need a venue for an", ...)
+_PREFIX = r"""
+    (?:please\s+)?
+    (?:
+        (?:help\s+me\s+)?(?:plan|organi[sz]e|host|arrange)
+      | i(?:'m|\s+am)\s+(?:planning|organi[sz]ing|hosting)
+      | (?:i\s+need|find|find\s+me|looking\s+for|search\s+for|suggest)\s+
+            (?:a\s+|some\s+)?(?:venues?|places?|locations?|spots?)\s+for
+      | book\s+(?:a\s+)?(?:venue\s+)?for
+    )\s+
+    (?:(?:a|an|the|my|our)\s+)?
+"""
+
+_STRICT = re.compile(
+    rf"""^\s*(?:{_PREFIX})?
+        (?P<event>[^.,;!?]+?)\s+in\s+
+        (?P<location>[^.;!?]+?)\s*,?\s+
+        (?:(?:for|on)\s+)?
+        (?P<date>{DATE_GRAMMAR})
+        \s*[.!?]?\s*$""",
+    re.IGNORECASE | re.VERBOSE,
+)
+
+_LENIENT = re.compile(
+    rf"""^\s*(?:{_PREFIX})?
+        (?P<event>.+?)\s+in\s+
+        (?P<location>.+?)
+        (?:\s+for\s+(?P<date>.+?))?
+        \s*[.!?]?\s*$""",
+    re.IGNORECASE | re.VERBOSE,
+)
+
+# Free-text requirements appended by the form ("... . Requirements: catering")
+_REQUIREMENTS = re.compile(r"\.\s*requirements:\s*(?P<requirements>.*)$", re.IGNORECASE | re.DOTALL)
+
+# Longest event/location (in words) the fast path accepts before deferring to the LLM
+MAX_FIELD_WORDS = 6
+
+# A connective inside a field means the template split is ambiguous ("a party in honor of Mom in Boston")
+_AMBIGUOUS_FIELD = re.compile(r"\b(?:in|for)\b", re.IGNORECASE)
+
+_lock = threading.Lock()
+_stats = Counter()
+
+
+def _clean(match):
+    fields = {name: " ".join(match.group(name).split()) for name in ("event", "location")}
+    date = match.group("date")
+    fields["date"] = " ".join(date.lower().split()) if date else None
+    if fields["date"] and fields["date"].startswith("on "):
+        fields["date"] = fields["date"][3:]
+    return fields
+
+
+def record_attempt(hit):
+    """Count one fast-path attempt in the parser stats"""
+    with _lock:
+        _stats["attempts"] += 1
+        _stats["hits"] += bool(hit)
+
+
+def _strict_fields(text):
+    match = _STRICT.match(text)
+    if match is None:
+        return None
+    fields = _clean(match)
+    if any(len(fields[name].split()) > MAX_FIELD_WORDS or _AMBIGUOUS_FIELD.search(fields[name])
+           for name in ("event", "location")):
+        return None
+    return fields
+
+
+def parse_event_query(query, lenient=False, record_stats=True):
+    """Extract {location, date, event} from query, or return None if not confident.
+
+    Form-appended requirements (". Requirements: ...") are returned as
+    requirements when present. With lenient=True the date is not checked
+    against the date grammar and may be None; this mode backs the
+    query_analyzer fallback when the LLM fails. record_stats=False leaves the
+    fast-path stats alone, for callers that parse ahead of query_analyzer.
+    """
+    requirements_match = _REQUIREMENTS.search(query or "")
+    text = (query or "")[:requirements_match.start()] if requirements_match else (query or "")
+    text = text.strip()
+
+    if lenient:
+        match = _LENIENT.match(text)
+        fields = _clean(match) if match else None
+    else:
+        fields = _strict_fields(text)
+        if record_stats:
+            record_attempt(fields is not None)
+
+    if fields is not None and requirements_match and requirements_match.group("requirements").strip():
+        fields["requirements"] = " ".join(requirements_match.group("requirements").split())
+    return fields
+
+
+def get_parser_stats():
+    """Return fast-path attempts, hits and hit rate"""
+    with _lock:
+        attempts, hits = _stats["attempts"], _stats["hits"]
+    return {"attempts": attempts, "hits": hits, "hit_rate": hits / attempts if attempts else 0.0}
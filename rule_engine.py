@@ -0,0 +1,173 @@
+"""
+Deterministic recommendation builder, the zero-LLM alternative to
+recommendation_analyzer's chat call.
+
+The indoor/outdoor decision comes from the WMO weather code and precipitation
+probability in the weather report, the top venues from their suitability
+scores and the suggested timing from the forecast temperatures. The report is
+filled in from templates, so it costs no tokens and no LLM round trip.
+"""
+import json
+
+from settings import get_settings
+
+RECOMMENDATION_MODES = ("llm", "rules")
+
+# WMO weather code groups (https://open-meteo.com/en/docs)
+SEVERE_CODES = frozenset({65, 67, 75, 82, 86, 95, 96, 99})
+WET_CODES = frozenset({51, 53, 55, 56, 57, 61, 63, 66, 71, 73, 77, 80, 81, 85})
+FOG_CODES = frozenset({45, 48})
+
+# Precipitation probability (%) from which an outdoor plan needs cover, and from which it moves inside
+COVER_PRECIPITATION = 30
+INDOOR_PRECIPITATION = 60
+
+# Daily maximum (°C) bounds for comfortable outdoor events
+COLD_MAX_TEMP = 12
+HOT_MAX_TEMP = 30
+
+REPORT_TEMPLATE = """# {event_title} Recommendation for {location}
+
+## Indoors or Outdoors
+**{setting_title}.** {setting_reason}
+
+## Top Venues
+{venue_lines}
+
+## Suggested Timing
+**{timing_title}.** {timing_reason}
+
+## Preparations
+{preparation_lines}
+
+## Alternative Plan
+{alternative}
+"""
+
+
+def resolve_mode(mode=None):
+    """Return mode if it is a known recommendation mode, else the configured default"""
+    return mode if mode in RECOMMENDATION_MODES else get_settings().recommendation.default_mode
+
+
+def parse_weather(weather_report):
+    """Return the weather report dict, or None when only an error message is available"""
+    if isinstance(weather_report, dict):
+        return weather_report
+    try:
+        weather = json.loads(weather_report)
+    except (TypeError, ValueError):
+        return None
+    return weather if isinstance(weather, dict) else None
+
+
+def choose_setting(weather):
+    """Return ("indoors" | "outdoors" | "covered outdoors", reason)"""
+    if weather is None:
+        return "indoors", "No forecast is available for the date, so an indoor venue is the safe choice."
+
+    code = weather.get("weather_code")
+    precipitation = weather.get("precipitation_probability") or 0
+    max_temp = weather.get("max_temp")
+    conditions = f"{weather.get('description', 'Unknown').lower()} with a {precipitation}% chance of precipitation"
+
+    if code in SEVERE_CODES:
+        return "indoors", f"The forecast shows {conditions}, which rules out an outdoor event."
+    if code in WET_CODES or precipitation >= INDOOR_PRECIPITATION:
+        return "indoors", f"The forecast shows {conditions}, so plan for an indoor venue."
+    if max_temp is not None and (max_temp < COLD_MAX_TEMP or max_temp > HOT_MAX_TEMP):
+        feel = "cold" if max_temp < COLD_MAX_TEMP else "hot"
+        return "indoors", f"A high of {max_temp}°C is too {feel} for guests to stay comfortable outside."
+    if code in FOG_CODES or precipitation >= COVER_PRECIPITATION:
+        return "covered outdoors", (f"The forecast shows {conditions}; an outdoor setting works "
+                                    "if there is cover to fall back on.")
+    return "outdoors", f"The forecast shows {conditions}, good conditions for an outdoor setting."
+
+
+def choose_timing(weather, event):
+    """Return (time of day, reason) based on the forecast temperatures"""
+    if weather is None or weather.get("max_temp") is None:
+        return "Afternoon", "Without a forecast, the afternoon gives the most flexibility."
+    max_temp = weather["max_temp"]
+    min_temp = weather.get("min_temp", max_temp)
+    if max_temp >= 27:
+        return "Evening", f"Temperatures peak at {max_temp}°C, so start after the heat of the day has passed."
+    if max_temp < 15:
+        return "Afternoon", f"With a high of only {max_temp}°C, the afternoon is the warmest part of the day."
+    if "conference" in event.lower() or "meeting" in event.lower():
+        return "Morning", f"Mild temperatures ({min_temp}–{max_temp}°C) suit an early start for a full-day agenda."
+    return "Afternoon", f"Mild temperatures ({min_temp}–{max_temp}°C) make the afternoon comfortable for guests."
+
+
+def top_venues(venues, count=2):
+    """Return the count best venues by suitability score, then rating"""
+    def rating(venue):
+        try:
+            return float(str(venue.rating).split("/")[0])
+        except ValueError:
+            return 0.0
+    return sorted(venues or [], key=lambda venue: (-venue.suitability_score, -rating(venue)))[:count]
+
+
+def _preparations(weather, setting):
+    preparations = []
+    if weather is not None:
+        precipitation = weather.get("precipitation_probability") or 0
+        max_temp = weather.get("max_temp")
+        if setting != "outdoors" or precipitation >= COVER_PRECIPITATION:
+            preparations.append("Arrange umbrellas and a covered arrival area in case of rain.")
+        if max_temp is not None and max_temp >= 27:
+            preparations.append("Provide shade, fans and plenty of drinking water.")
+        if max_temp is not None and max_temp < 15:
+            preparations.append("Make sure the venue is heated and offer a cloakroom.")
+        if weather.get("weather_code") in FOG_CODES:
+            preparations.append("Share clear directions and parking details; fog can slow arrivals.")
+    else:
+        preparations.append("Check the forecast again closer to the date.")
+    preparations.append("Confirm capacity, catering and accessibility with the venue in writing.")
+    return preparations
+
+
+def build_recommendation(event, location, weather_report, venues, requirements="", ranked_days=None):
+    """Build the recommendation report from the weather report and venue scores"""
+    weather = parse_weather(weather_report)
+    setting, setting_reason = choose_setting(weather)
+    timing, timing_reason = choose_timing(weather, event)
+    best = top_venues(venues)
+
+    if best:
+        venue_lines = "\n".join(
+            f"{rank}. **{venue.name}** ({venue.address}) - suitability {venue.suitability_score}/10, "
+            f"rating {venue.rating}. {venue.details}"
+            for rank, venue in enumerate(best, start=1)
+        )
+    else:
+        venue_lines = "No suitable venues were found; widen the search to nearby areas."
+
+    preparations = _preparations(weather, setting)
+    if requirements:
+        preparations.append(f"Check that the venue can meet your requirements: {requirements}.")
+
+    if setting != "indoors":
+        alternative = "Reserve an indoor space at or near the venue in case the weather turns."
+    else:
+        alternative = "Keep a second indoor option on hold in case the first venue falls through."
+    if len(best) > 1:
+        alternative += f" {best[1].name} is the natural backup to {best[0].name}."
+    if ranked_days and len(ranked_days) > 1:
+        runner_up = ranked_days[1]
+        alternative += (f" If the date can move, {runner_up['day_name']} {runner_up['date']} has the next best "
+                        f"forecast ({runner_up['description'].lower()}, {runner_up['min_temp']}–"
+                        f"{runner_up['max_temp']}°C).")
+
+    return REPORT_TEMPLATE.format(
+        event_title=event.strip().title() or "Event",
+        location=location,
+        setting_title=setting.capitalize(),
+        setting_reason=setting_reason,
+        venue_lines=venue_lines,
+        timing_title=timing,
+        timing_reason=timing_reason,
+        preparation_lines="\n".join(f"- {item}" for item in preparations),
+        alternative=alternative,
+    )
@@ -0,0 +1,355 @@
+"""
+Typed, immutable application settings.
+
+config.json and settings.yaml are parsed once into frozen dataclasses and
+checked at startup, so a missing or mistyped key fails at boot instead of in
+the middle of a plan. get_settings() hands out the cached object and re-parses
+only when one of the files' mtimes changes (checked at most once per
+RELOAD_CHECK_SECONDS). A broken file fails the first load, but a broken edit
+after that is reported and the last good settings stay in use until the
+files change again.
+"""
+import dataclasses
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import typing
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import yaml
+
+CONFIG_PATH = "config.json"
+SETTINGS_PATH = "settings.yaml"
+
+# How often get_settings() stats the files for changes
+RELOAD_CHECK_SECONDS = 1.0
+
+
+class SettingsError(ValueError):
+    """Raised when config.json or settings.yaml is missing, malformed or incomplete"""
+
+
+@dataclass(frozen=True)
+class AppSettings:
+    title: str
+    icon: str = "🎪"
+    layout: str = "wide"
+    sidebar_state: str = "expanded"
+
+
+@dataclass(frozen=True)
+class WeatherApiSettings:
+    geocoding_url: str
+    forecast_url: str
+
+
+@dataclass(frozen=True)
+class ApiSettings:
+    default_model: str
+    weather: WeatherApiSettings
+
+
+@dataclass(frozen=True)
+class DefaultValues:
+    event: str
+    location: str
+    date: str
+
+
+@dataclass(frozen=True)
+class LimitsSettings:
+    max_venues: int = 5
+    # Search passages considered for venue extraction
+    max_search_results: int = 1000
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry_seconds: float = 60
+
+
+@dataclass(frozen=True)
+class OpenAISettings:
+    timeout_seconds: Optional[float] = 30
+    pool: PoolSettings = PoolSettings()
+
+
+@dataclass(frozen=True)
+class HttpSettings:
+    connect_timeout_seconds: float = 5
+    read_timeout_seconds: float = 15
+    max_retries: int = 3
+    backoff_base_seconds: float = 0.25
+    backoff_max_seconds: float = 4
+    max_connections_per_host: int = 20
+
+
+@dataclass(frozen=True)
+class CacheEntrySettings:
+    memory_entries: int = 1024
+    ttl_seconds: Optional[float] = None
+    persistent: bool = False
+    disk_entries: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class CacheSettings:
+    directory: str = ".cache"
+    geocode: CacheEntrySettings = CacheEntrySettings(memory_entries=2048, persistent=True)
+    # Open-Meteo refreshes its models roughly hourly
+    forecast: CacheEntrySettings = CacheEntrySettings(memory_entries=1024, ttl_seconds=3600)
+    search: CacheEntrySettings = CacheEntrySettings(memory_entries=1024, ttl_seconds=86400, disk_entries=10000)
+    venues: CacheEntrySettings = CacheEntrySettings(memory_entries=512, persistent=True, disk_entries=5000)
+    # Upper bound; a plan also expires with the forecast it was built on
+    plans: CacheEntrySettings = CacheEntrySettings(memory_entries=512, ttl_seconds=3600)
+
+
+@dataclass(frozen=True)
+class TracingSettings:
+    enabled: bool = True
+    jsonl_path: Optional[str] = None
+    metrics_port: Optional[int] = None
+    metrics_host: str = "127.0.0.1"
+
+
+@dataclass(frozen=True)
+class SearchCompactionSettings:
+    enabled: bool = True
+    token_budget: int = 600
+
+
+@dataclass(frozen=True)
+class VenueDigestSettings:
+    enabled: bool = True
+    min_suitability: int = 5
+    max_detail_chars: int = 120
+
+
+@dataclass(frozen=True)
+class RecommendationSettings:
+    default_mode: str = "llm"
+
+
+@dataclass(frozen=True)
+class FlexibleDateSettings:
+    top_days: int = 3
+    comfortable_max_temp: Tuple[float, ...] = (18, 26)
+    cold_min_temp: float = 5
+
+
+@dataclass(frozen=True)
+class ServerSettings:
+    host: str = "127.0.0.1"
+    port: int = 8080
+    max_concurrency: int = 32
+    max_queue: int = 256
+    queue_timeout_seconds: float = 30
+    max_batch_size: int = 100
+    drain_timeout_seconds: float = 60
+
+
+@dataclass(frozen=True)
+class Settings:
+    # From config.json
+    app: AppSettings
+    api: ApiSettings
+    default_values: DefaultValues
+    date_options: Tuple[str, ...]
+    # From settings.yaml
+    limits: LimitsSettings = LimitsSettings()
+    openai: OpenAISettings = OpenAISettings()
+    http: HttpSettings = HttpSettings()
+    cache: CacheSettings = CacheSettings()
+    tracing: TracingSettings = TracingSettings()
+    search_compaction: SearchCompactionSettings = SearchCompactionSettings()
+    venue_digest: VenueDigestSettings = VenueDigestSettings()
+    recommendation: RecommendationSettings = RecommendationSettings()
+    flexible_date: FlexibleDateSettings = FlexibleDateSettings()
+    server: ServerSettings = ServerSettings()
+    # Hash of both files' contents, used to key anything built from the settings
+    fingerprint: str = ""
+
+
+def _coerce(value, annotation, path):
+    """Check value against a field annotation, converting lists to tuples and ints to floats"""
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union:
+        if value is None:
+            return None
+        annotation = next(arg for arg in typing.get_args(annotation) if arg is not type(None))
+        origin = typing.get_origin(annotation)
+
+    if dataclasses.is_dataclass(annotation):
+        if not isinstance(value, dict):
+            raise SettingsError(f"{path} must be a mapping")
+        return _build(annotation, value, path)
+    if origin is tuple:
+        if not isinstance(value, (list, tuple)):
+            raise SettingsError(f"{path} must be a list")
+        item_type = typing.get_args(annotation)[0]
+        return tuple(_coerce(item, item_type, f"{path}[{index}]") for index, item in enumerate(value))
+    if annotation is float and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    if (annotation is int and isinstance(value, bool)) or not isinstance(value, annotation):
+        raise SettingsError(f"{path} must be of type {annotation.__name__}, got {value!r}")
+    return value
+
+
+def _default(item, base):
+    if base is not None:
+        return getattr(base, item.name)
+    if item.default is not dataclasses.MISSING:
+        return item.default
+    if item.default_factory is not dataclasses.MISSING:
+        return item.default_factory()
+    return dataclasses.MISSING
+
+
+def _build(cls, data, path, base=None):
+    """Build a frozen dataclass from a mapping, falling back to base or the field defaults"""
+    hints = typing.get_type_hints(cls)
+    values = {}
+    for item in dataclasses.fields(cls):
+        key_path = f"{path}.{item.name}" if path else item.name
+        value = data.get(item.name)
+        default = _default(item, base)
+        if value is None:
+            if default is dataclasses.MISSING:
+                raise SettingsError(f"Missing required setting: {key_path}")
+            values[item.name] = default
+        elif dataclasses.is_dataclass(hints[item.name]) and default is not dataclasses.MISSING:
+            # Partial sections keep the defaults of the keys they leave out
+            if not isinstance(value, dict):
+                raise SettingsError(f"{key_path} must be a mapping")
+            values[item.name] = _build(hints[item.name], value, key_path, default)
+        else:
+            values[item.name] = _coerce(value, hints[item.name], key_path)
+    return cls(**values)
+
+
+def _read(path, parse):
+    try:
+        with open(path, 'rb') as f:
+            raw = f.read()
+    except FileNotFoundError:
+        raise SettingsError(f"{path} not found in {os.getcwd()}") from None
+    try:
+        data = parse(raw) if raw.strip() else {}
+    except (ValueError, yaml.YAMLError) as e:
+        raise SettingsError(f"{path} is not valid: {e}") from e
+    if not isinstance(data, dict):
+        raise SettingsError(f"{path} must contain a mapping at the top level")
+    return raw, data
+
+
+def _check_bounds(loaded):
+    """Reject numeric settings the clients, caches and server cannot run with"""
+    positive = {
+        "http.connect_timeout_seconds": loaded.http.connect_timeout_seconds,
+        "http.read_timeout_seconds": loaded.http.read_timeout_seconds,
+        "http.max_connections_per_host": loaded.http.max_connections_per_host,
+        "openai.timeout_seconds": loaded.openai.timeout_seconds,
+        "openai.pool.max_connections": loaded.openai.pool.max_connections,
+        "search_compaction.token_budget": loaded.search_compaction.token_budget,
+        "server.queue_timeout_seconds": loaded.server.queue_timeout_seconds,
+        "server.drain_timeout_seconds": loaded.server.drain_timeout_seconds,
+        "server.max_batch_size": loaded.server.max_batch_size,
+    }
+    for name in ("geocode", "forecast", "search", "venues", "plans"):
+        positive[f"cache.{name}.memory_entries"] = getattr(loaded.cache, name).memory_entries
+    non_negative = {
+        "http.max_retries": loaded.http.max_retries,
+        "http.backoff_base_seconds": loaded.http.backoff_base_seconds,
+        "http.backoff_max_seconds": loaded.http.backoff_max_seconds,
+        "openai.pool.max_keepalive_connections": loaded.openai.pool.max_keepalive_connections,
+        "openai.pool.keepalive_expiry_seconds": loaded.openai.pool.keepalive_expiry_seconds,
+    }
+    for name, value in positive.items():
+        # None means "no limit" where the field is optional
+        if value is not None and value <= 0:
+            raise SettingsError(f"{name} must be greater than 0")
+    for name, value in non_negative.items():
+        if value < 0:
+            raise SettingsError(f"{name} must be at least 0")
+
+
+def load(config_path=CONFIG_PATH, settings_path=SETTINGS_PATH):
+    """Parse and validate both files into a Settings object"""
+    config_raw, config = _read(config_path, json.loads)
+    settings_raw, settings = _read(settings_path, yaml.safe_load)
+
+    merged = {key: settings.get(key) for key in (
+        "openai", "http", "cache", "tracing", "search_compaction", "venue_digest", "recommendation", "flexible_date",
+        "server",
+    )}
+    for key in ("app", "api", "default_values", "date_options"):
+        merged[key] = config.get(key)
+    # Limits may be set in either file; config.json wins
+    merged["limits"] = {**(settings.get("limits") or {}), **(config.get("limits") or {})}
+    try:
+        merged["fingerprint"] = hashlib.sha256(config_raw + b"\0" + settings_raw).hexdigest()
+        loaded = _build(Settings, merged, "")
+    except SettingsError as e:
+        raise SettingsError(f"{e} (config.json / settings.yaml)") from None
+
+    if loaded.recommendation.default_mode not in ("llm", "rules"):
+        raise SettingsError("recommendation.default_mode must be 'llm' or 'rules'")
+    if loaded.server.max_concurrency < 1 or loaded.server.max_queue < 0:
+        raise SettingsError("server.max_concurrency must be at least 1 and server.max_queue at least 0")
+    if len(loaded.flexible_date.comfortable_max_temp) != 2:
+        raise SettingsError("flexible_date.comfortable_max_temp must be [low, high]")
+    _check_bounds(loaded)
+    return loaded
+
+
+_lock = threading.Lock()
+_current = None
+_mtimes = None
+_checked_at = 0.0
+
+
+def _file_mtimes():
+    mtimes = []
+    for path in (CONFIG_PATH, SETTINGS_PATH):
+        try:
+            mtimes.append(os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            mtimes.append(None)
+    return tuple(mtimes)
+
+
+def get_settings():
+    """Return the current Settings, re-parsing only when a file changed on disk"""
+    global _current, _mtimes, _checked_at
+    now = time.monotonic()
+    if _current is not None and now - _checked_at < RELOAD_CHECK_SECONDS:
+        return _current
+
+    with _lock:
+        if _current is not None and now - _checked_at < RELOAD_CHECK_SECONDS:
+            return _current
+        mtimes = _file_mtimes()
+        if _current is None:
+            _current = load()
+        elif mtimes != _mtimes:
+            try:
+                _current = load()
+            except SettingsError as e:
+                print(f"[settings] reload failed, keeping the previous settings: {e}", file=sys.stderr)
+        # Recorded even after a failed reload so the broken files are not re-parsed on every call
+        _mtimes = mtimes
+        _checked_at = now
+        return _current
+
+
+def reset():
+    """Forget the cached settings, e.g. after changing the working directory"""
+    global _current, _mtimes, _checked_at
+    with _lock:
+        _current, _mtimes, _checked_at = None, None, 0.0
@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+# The planner modules live at the repository root
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+
+@pytest.fixture(autouse=True)
+def repo_cwd(monkeypatch):
+    """config.json and settings.yaml are read relative to the working directory"""
+    monkeypatch.chdir(REPO_ROOT)
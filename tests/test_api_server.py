@@ -0,0 +1,94 @@
+"""Admission accounting in the API server: queue limits, timeouts and the idle flag drain waits on."""
+import asyncio
+
+import pytest
+
+from api_server import Admission, AdmissionError
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_reserving_nothing_keeps_the_server_idle():
+    async def scenario():
+        admission = Admission(max_concurrency=1, max_queue=0, queue_timeout=1)
+        admission.reserve(0)
+        # An empty drain returns at once instead of waiting out the timeout
+        await asyncio.wait_for(admission.drain(timeout=5), 0.5)
+        return admission
+
+    admission = run(scenario())
+    assert admission.stats() == {"in_flight": 0, "queued": 0, "rejected": {}}
+
+
+def test_full_queue_is_rejected():
+    async def scenario():
+        admission = Admission(max_concurrency=1, max_queue=1, queue_timeout=1)
+        admission.reserve(2)
+        with pytest.raises(AdmissionError) as rejected:
+            admission.reserve()
+        return admission, rejected.value
+
+    admission, error = run(scenario())
+    assert error.status == 429
+    assert admission.rejected["queue_full"] == 1
+
+
+def test_queue_timeout_releases_its_place():
+    async def scenario():
+        admission = Admission(max_concurrency=1, max_queue=1, queue_timeout=0.05)
+        admission.reserve(2)
+        async with admission.slot():
+            with pytest.raises(AdmissionError) as rejected:
+                async with admission.slot():
+                    pass
+            assert rejected.value.status == 429
+            assert admission.stats()["queued"] == 0
+            assert not admission._idle.is_set()
+        assert admission._idle.is_set()
+        return admission
+
+    admission = run(scenario())
+    assert admission.stats() == {"in_flight": 0, "queued": 0, "rejected": {"queue_timeout": 1}}
+
+
+def test_cancelled_waiter_leaves_the_server_idle():
+    async def scenario():
+        admission = Admission(max_concurrency=1, max_queue=1, queue_timeout=5)
+        admission.reserve(2)
+        holder_release = asyncio.Event()
+
+        async def hold():
+            async with admission.slot():
+                await holder_release.wait()
+
+        async def wait():
+            async with admission.slot():
+                pass
+
+        holder = asyncio.ensure_future(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(wait())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert admission.stats()["queued"] == 0
+        holder_release.set()
+        await holder
+        return admission
+
+    admission = run(scenario())
+    assert admission._idle.is_set()
+    assert admission.stats()["in_flight"] == 0
+
+
+def test_draining_rejects_new_plans():
+    async def scenario():
+        admission = Admission(max_concurrency=1, max_queue=0, queue_timeout=1)
+        await admission.drain(timeout=0.1)
+        with pytest.raises(AdmissionError) as rejected:
+            admission.reserve()
+        return rejected.value
+
+    assert run(scenario()).status == 503
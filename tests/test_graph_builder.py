@@ -0,0 +1,76 @@
+"""Node execution counts for the event planning graph, with stub nodes in place of the real ones."""
+import asyncio
+from collections import Counter
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+import graph_builder
+from models import EventVenue
+
+NODE_NAMES = ("query_analyzer", "weather_fetcher", "event_planning_assistant", "venues_list_formatter",
+              "recommendation_analyzer")
+
+STUB_UPDATES = {
+    "query_analyzer": {"event": "wedding", "location": "Paris", "date": "next saturday"},
+    "weather_fetcher": {"weather_report": "{}", "weather_ready": True},
+    "event_planning_assistant": {"search_result": "Grand Hall ... 12 Main Street"},
+    "venues_list_formatter": {
+        "venues": [EventVenue(name="Grand Hall", address="12 Main Street", details="Ballroom", suitability_score=8)],
+        "venues_ready": True,
+    },
+    "recommendation_analyzer": {"recommendation": "Book the Grand Hall."},
+}
+
+CHAT_INPUT = {"messages": [HumanMessage(content="Plan a wedding in Paris for next saturday")]}
+STRUCTURED_INPUT = {"event": "wedding", "location": "Paris", "date": "next saturday", "requirements": ""}
+
+
+@pytest.fixture
+def stub_graph(monkeypatch):
+    """Build the graph with stub nodes that count their executions"""
+    calls = Counter()
+
+    def stub(name):
+        def node(state):
+            calls[name] += 1
+            return dict(STUB_UPDATES[name])
+
+        async def anode(state):
+            calls[name] += 1
+            return dict(STUB_UPDATES[name])
+
+        return node, anode
+
+    for name in NODE_NAMES:
+        node, anode = stub(name)
+        monkeypatch.setattr(graph_builder, name, node)
+        monkeypatch.setattr(graph_builder, f"a{name}", anode)
+    return graph_builder.build_event_planning_graph(), calls
+
+
+@pytest.mark.parametrize("use_async", [False, True], ids=["invoke", "ainvoke"])
+def test_chat_input_runs_every_node_once(stub_graph, use_async):
+    graph, calls = stub_graph
+    state = asyncio.run(graph.ainvoke(CHAT_INPUT)) if use_async else graph.invoke(CHAT_INPUT)
+
+    assert calls == Counter({name: 1 for name in NODE_NAMES})
+    assert state["recommendation"] == "Book the Grand Hall."
+
+
+@pytest.mark.parametrize("use_async", [False, True], ids=["invoke", "ainvoke"])
+def test_structured_input_skips_query_analyzer(stub_graph, use_async):
+    graph, calls = stub_graph
+    state = asyncio.run(graph.ainvoke(STRUCTURED_INPUT)) if use_async else graph.invoke(STRUCTURED_INPUT)
+
+    assert calls == Counter({name: 1 for name in NODE_NAMES if name != "query_analyzer"})
+    assert state["recommendation"] == "Book the Grand Hall."
+
+
+def test_repeated_runs_do_not_accumulate(stub_graph):
+    graph, calls = stub_graph
+    for _ in range(3):
+        graph.invoke(STRUCTURED_INPUT)
+
+    assert calls["recommendation_analyzer"] == 3
+    assert calls["query_analyzer"] == 0
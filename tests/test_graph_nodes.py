@@ -0,0 +1,81 @@
+"""Caching in the venue search and extraction nodes, with the search tool and LLM replaced."""
+import pytest
+
+import graph_nodes
+from caching import MISSING, TieredCache, normalize_key
+from models import EventVenue, VenuesList
+
+STATE = {"event": "wedding", "location": "Austin"}
+
+
+class StubSearchTool:
+    def __init__(self, result):
+        self.result = result
+
+    def run(self, query):
+        return self.result
+
+
+@pytest.fixture
+def search_cache(monkeypatch):
+    cache = TieredCache(memory_entries=16)
+    monkeypatch.setattr(graph_nodes, "get_search_cache", lambda: cache)
+    return cache
+
+
+def use_search_result(monkeypatch, result):
+    monkeypatch.setattr(graph_nodes, "_search_tool", lambda: StubSearchTool(result))
+
+
+def test_search_results_are_cached(search_cache, monkeypatch):
+    use_search_result(monkeypatch, "The Grand Hall in Austin seats 300 guests.")
+
+    update = graph_nodes.event_planning_assistant(STATE)
+
+    assert update == {"search_result": "The Grand Hall in Austin seats 300 guests."}
+    assert search_cache.get(normalize_key("wedding", "Austin")) == update["search_result"]
+
+
+@pytest.mark.parametrize("result", ["", "No good DuckDuckGo Search Result was found"])
+def test_empty_search_is_not_cached(search_cache, monkeypatch, result):
+    use_search_result(monkeypatch, result)
+
+    update = graph_nodes.event_planning_assistant(STATE)
+
+    assert update["degraded"] is True
+    assert search_cache.get(normalize_key("wedding", "Austin")) is MISSING
+
+
+class StubExtractor:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def invoke(self, prompt):
+        self.calls.append(prompt)
+        return VenuesList(venues=[EventVenue(name="Grand Hall", address="12 Main Street", details="Ballroom",
+                                             suitability_score=8)])
+
+
+@pytest.fixture
+def extraction_calls(monkeypatch):
+    calls, cache = [], TieredCache(memory_entries=16)
+    monkeypatch.setattr(graph_nodes, "get_venue_cache", lambda: cache)
+    monkeypatch.setattr(graph_nodes, "_structured_llm", lambda schema: StubExtractor(calls))
+    return calls
+
+
+def test_venue_lists_are_cached_per_location(extraction_calls):
+    error = "Error searching for venues: rate limited"
+    for location in ("Austin", "Boston", "Austin"):
+        graph_nodes.venues_list_formatter({**STATE, "location": location, "search_result": error})
+
+    # The same error text in two cities must not share a venue list
+    assert len(extraction_calls) == 2
+
+
+def test_venues_from_degraded_search_are_not_cached(extraction_calls):
+    state = {**STATE, "search_result": "No good DuckDuckGo Search Result was found", "degraded": True}
+    graph_nodes.venues_list_formatter(state)
+    graph_nodes.venues_list_formatter(state)
+
+    assert len(extraction_calls) == 2
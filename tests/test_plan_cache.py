@@ -0,0 +1,129 @@
+"""Plan fingerprints, storage rules and sharing of identical concurrent plans."""
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+import plan_cache
+import query_parser
+import utils
+from caching import LRUCache
+
+STRUCTURED = {"event": "wedding", "location": "Paris", "date": "next saturday", "requirements": ""}
+FINAL_UPDATES = {"weather_fetcher": {"weather_report": "{}", "ranked_days": []},
+                 "recommendation_analyzer": {"recommendation": "Book the Grand Hall."}}
+
+
+class StubGraph:
+    """Counts runs; each run waits a moment so identical requests overlap"""
+
+    def __init__(self):
+        self.runs = 0
+
+    async def astream(self, graph_input, stream_mode=None):
+        self.runs += 1
+        await asyncio.sleep(0.05)
+        for node, update in FINAL_UPDATES.items():
+            yield "updates", {node: update}
+
+    async def ainvoke(self, graph_input):
+        state = dict(graph_input)
+        async for _, chunk in self.astream(graph_input):
+            for update in chunk.values():
+                state.update(update)
+        return state
+
+
+@pytest.fixture(autouse=True)
+def fresh_plan_cache(monkeypatch):
+    cache = LRUCache(max_entries=16, ttl_seconds=3600)
+    monkeypatch.setattr(plan_cache, "_plan_cache", cache)
+    # Plans are stored as if the forecast they used never expires
+    monkeypatch.setattr(utils, "forecast_expires_at", lambda location: None)
+    return cache
+
+
+def fingerprint(graph_input):
+    return plan_cache.prepare(graph_input)[0]
+
+
+def test_fingerprint_ignores_spacing_and_case():
+    assert fingerprint(STRUCTURED) == fingerprint({**STRUCTURED, "event": " Wedding ", "date": "Next  Saturday"})
+
+
+@pytest.mark.parametrize("change", [{"location": "Lyon"}, {"requirements": "vegan menu"},
+                                    {"date": "next sunday"}, {"recommendation_mode": "rules"}])
+def test_fingerprint_covers_every_input(change):
+    assert fingerprint(STRUCTURED) != fingerprint({**STRUCTURED, **change})
+
+
+def test_free_text_matches_its_structured_form():
+    message = HumanMessage(content="Plan a wedding in Paris for next saturday. Requirements: vegan menu")
+    key, graph_input = plan_cache.prepare({"messages": [message]})
+
+    assert graph_input["requirements"] == "vegan menu"
+    assert key == fingerprint({**STRUCTURED, "requirements": "vegan menu"})
+
+
+def test_prepare_records_one_parser_attempt_per_request():
+    before = query_parser.get_parser_stats()
+    plan_cache.prepare({"messages": [HumanMessage(content="Plan a wedding in Paris for next saturday")]})
+    plan_cache.prepare({"messages": [HumanMessage(content="something fun somewhere warm, ideas?")]})
+    after = query_parser.get_parser_stats()
+
+    # The unparsed query is counted by query_analyzer when the graph runs
+    assert after["attempts"] - before["attempts"] == 1
+    assert after["hits"] - before["hits"] == 1
+
+
+def test_unresolvable_date_is_not_cached():
+    assert fingerprint({**STRUCTURED, "date": "when the cherry blossoms bloom"}) is None
+
+
+def test_degraded_plans_are_not_stored(fresh_plan_cache):
+    key = fingerprint(STRUCTURED)
+    plan_cache.store(key, {**STRUCTURED, "degraded": True})
+
+    assert len(fresh_plan_cache) == 0
+
+
+def test_plan_expires_with_its_forecast(fresh_plan_cache, monkeypatch):
+    monkeypatch.setattr(utils, "forecast_expires_at", lambda location: time.time() + 60)
+    key = fingerprint(STRUCTURED)
+    plan_cache.store(key, dict(STRUCTURED))
+
+    assert fresh_plan_cache.expires_at(key) <= time.time() + 60
+
+
+def stream_state(graph, graph_input):
+    async def collect():
+        key, prepared = plan_cache.prepare(graph_input)
+        state = dict(prepared)
+        async for mode, chunk in plan_cache.astream_plan(graph, key, prepared):
+            for update in chunk.values():
+                state.update(update)
+        return state
+    return collect()
+
+
+def test_identical_concurrent_plans_share_one_run():
+    graph = StubGraph()
+
+    async def run_all():
+        return await asyncio.gather(stream_state(graph, STRUCTURED), stream_state(graph, STRUCTURED),
+                                    plan_cache.ainvoke_plan(graph, dict(STRUCTURED)))
+
+    states = asyncio.run(run_all())
+
+    assert graph.runs == 1
+    assert all(state["recommendation"] == "Book the Grand Hall." for state in states)
+
+
+def test_stored_plan_is_replayed_without_running_the_graph():
+    graph = StubGraph()
+    asyncio.run(stream_state(graph, STRUCTURED))
+    state = asyncio.run(stream_state(graph, STRUCTURED))
+
+    assert graph.runs == 1
+    assert state["recommendation"] == "Book the Grand Hall."
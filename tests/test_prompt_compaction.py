@@ -0,0 +1,48 @@
+"""Search-result compaction on the space-joined snippets DuckDuckGoSearchRun returns."""
+from prompt_compaction import compact_search_result, split_passages
+
+REAL_TOOL_OUTPUT = ("The Grand Hall in Austin hosts weddings up to 300 guests. Sign up for our newsletter for deals. "
+                    "Lakeside Pavilion offers outdoor ceremonies near downtown.")
+
+
+def test_space_joined_snippets_split_into_sentences():
+    assert split_passages(REAL_TOOL_OUTPUT) == [
+        "The Grand Hall in Austin hosts weddings up to 300 guests",
+        "Sign up for our newsletter for deals",
+        "Lakeside Pavilion offers outdoor ceremonies near downtown",
+    ]
+
+
+def test_abbreviations_do_not_end_a_sentence():
+    assert split_passages("Dinner at The St. Regis with Dr. J. Smith. Rated 4.5/5 from 200 reviews") == [
+        "Dinner at The St. Regis with Dr. J. Smith",
+        "Rated 4.5/5 from 200 reviews",
+    ]
+
+
+def test_ellipses_still_separate_snippets():
+    assert split_passages("Grand Hall seats 300 guests ... Lakeside Pavilion, 12 Main Street") == [
+        "Grand Hall seats 300 guests",
+        "Lakeside Pavilion, 12 Main Street",
+    ]
+
+
+def test_boilerplate_drops_only_its_own_sentence():
+    result = compact_search_result(REAL_TOOL_OUTPUT, "wedding", "Austin")
+
+    assert "Grand Hall" in result.text
+    assert "Lakeside Pavilion" in result.text
+    assert "newsletter" not in result.text
+    assert result.passages_before == 3
+    assert result.passages_kept == 2
+
+
+def test_non_empty_input_never_compacts_to_empty():
+    result = compact_search_result("Cookie policy. Sign in to see more results.", "wedding", "Austin")
+
+    assert result.text == "Cookie policy. Sign in to see more results."
+    assert result.passages_kept == 0
+
+
+def test_empty_input_stays_empty():
+    assert compact_search_result("", "wedding", "Austin").text == ""
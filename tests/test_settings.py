@@ -0,0 +1,66 @@
+"""Settings validation at boot and hot reload of edited files."""
+import os
+import shutil
+
+import pytest
+import yaml
+
+import settings
+from conftest import REPO_ROOT
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """A working directory with copies of the shipped config files, reloaded on every call"""
+    for name in ("config.json", "settings.yaml"):
+        shutil.copy(os.path.join(REPO_ROOT, name), tmp_path / name)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(settings, "RELOAD_CHECK_SECONDS", 0.0)
+    settings.reset()
+    yield tmp_path
+    settings.reset()
+
+
+def edit_settings(workdir, section, values):
+    path = workdir / "settings.yaml"
+    data = yaml.safe_load(path.read_text())
+    data[section] = {**(data.get(section) or {}), **values}
+    path.write_text(yaml.safe_dump(data))
+    # Make sure the change is visible even on filesystems with coarse mtimes
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.mark.parametrize("section, values, message", [
+    ("http", {"max_retries": -1}, "http.max_retries"),
+    ("http", {"read_timeout_seconds": 0}, "http.read_timeout_seconds"),
+    ("search_compaction", {"token_budget": 0}, "search_compaction.token_budget"),
+    ("openai", {"pool": {"max_connections": 0}}, "openai.pool.max_connections"),
+])
+def test_out_of_range_numbers_fail_at_boot(workdir, section, values, message):
+    edit_settings(workdir, section, values)
+
+    with pytest.raises(settings.SettingsError, match=message):
+        settings.get_settings()
+
+
+def test_reload_picks_up_valid_edits(workdir):
+    assert settings.get_settings().search_compaction.token_budget == 600
+
+    edit_settings(workdir, "search_compaction", {"token_budget": 400})
+
+    assert settings.get_settings().search_compaction.token_budget == 400
+
+
+def test_bad_reload_keeps_last_good_settings(workdir, monkeypatch, capsys):
+    good = settings.get_settings()
+    edit_settings(workdir, "http", {"max_retries": -1})
+
+    assert settings.get_settings() is good
+    assert "reload failed" in capsys.readouterr().err
+
+    # The broken file is not parsed again until it changes
+    loads = []
+    monkeypatch.setattr(settings, "load", lambda: loads.append(1))
+    assert settings.get_settings() is good
+    assert loads == []
@@ -0,0 +1,334 @@
+"""
+Lightweight tracing for the planning graph.
+
+Spans wrap graph nodes, LLM calls and outbound HTTP/search calls and record
+wall time, queue time (batch admission and per-host connection slots), bytes
+transferred, prompt/completion tokens and cache hits. Finished spans are
+aggregated in memory (p50/p95/p99 per span) and handed to pluggable exporters
+such as the JSONL trace file. Aggregates are served as Prometheus text from an
+optional local endpoint.
+"""
+import contextvars
+import functools
+import json
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from settings import get_settings
+
+# Latency samples kept per span for quantile estimates
+RESERVOIR_SIZE = 4096
+QUANTILES = (0.5, 0.95, 0.99)
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed unit of work: a node run, an LLM call or an outbound request"""
+
+    __slots__ = ("kind", "name", "started_at", "wall_ms", "queue_ms", "bytes", "prompt_tokens",
+                 "completion_tokens", "cache_hits", "cache_misses", "error", "parent", "attrs")
+
+    def __init__(self, kind, name, parent=None, queue_ms=0.0, **attrs):
+        self.kind = kind
+        self.name = name
+        self.started_at = time.time()
+        self.wall_ms = 0.0
+        self.queue_ms = queue_ms
+        self.bytes = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cache_hits = Counter()
+        self.cache_misses = Counter()
+        self.error = None
+        self.parent = parent
+        self.attrs = attrs
+
+    def to_dict(self):
+        return {
+            "kind": self.kind,
+            "name": self.name,
+            "parent": f"{self.parent.kind}:{self.parent.name}" if self.parent else None,
+            "started_at": round(self.started_at, 6),
+            "wall_ms": round(self.wall_ms, 3),
+            "queue_ms": round(self.queue_ms, 3),
+            "bytes": self.bytes,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cache_hits": dict(self.cache_hits),
+            "cache_misses": dict(self.cache_misses),
+            "error": self.error,
+            **self.attrs,
+        }
+
+
+class JSONLExporter:
+    """Append every finished span to a JSONL trace file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a')
+
+    def __call__(self, span):
+        line = json.dumps(span.to_dict()) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+
+class Tracer:
+    """Aggregate finished spans and fan them out to exporters"""
+
+    def __init__(self):
+        self.enabled = True
+        self.exporters = []
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=RESERVOIR_SIZE))
+        self._totals = defaultdict(Counter)
+
+    def add_exporter(self, exporter):
+        self.exporters.append(exporter)
+
+    def record(self, span):
+        key = (span.kind, span.name)
+        with self._lock:
+            self._samples[key].append(span.wall_ms)
+            totals = self._totals[key]
+            totals["count"] += 1
+            totals["wall_ms"] += span.wall_ms
+            totals["queue_ms"] += span.queue_ms
+            totals["bytes"] += span.bytes
+            totals["prompt_tokens"] += span.prompt_tokens
+            totals["completion_tokens"] += span.completion_tokens
+            totals["cache_hits"] += sum(span.cache_hits.values())
+            totals["cache_misses"] += sum(span.cache_misses.values())
+            totals["errors"] += 1 if span.error else 0
+        for exporter in self.exporters:
+            try:
+                exporter(span)
+            except Exception:
+                # Exporters must never break a plan
+                pass
+
+    def summary(self):
+        """Return per-span totals with p50/p95/p99 wall time in milliseconds"""
+        with self._lock:
+            snapshot = {key: (sorted(samples), dict(self._totals[key])) for key, samples in self._samples.items()}
+        summary = {}
+        for (kind, name), (samples, totals) in snapshot.items():
+            entry = dict(totals)
+            for quantile in QUANTILES:
+                entry[f"p{int(quantile * 100)}_ms"] = round(_quantile(samples, quantile), 3)
+            summary[f"{kind}:{name}"] = entry
+        return summary
+
+    def prometheus_text(self):
+        """Render the aggregates in the Prometheus text exposition format"""
+        with self._lock:
+            snapshot = {key: (sorted(samples), dict(self._totals[key])) for key, samples in self._samples.items()}
+
+        lines = [
+            "# HELP planner_span_seconds Wall time of traced planner spans",
+            "# TYPE planner_span_seconds summary",
+        ]
+        for (kind, name), (samples, totals) in sorted(snapshot.items()):
+            labels = f'kind="{kind}",name="{name}"'
+            for quantile in QUANTILES:
+                lines.append(f'planner_span_seconds{{{labels},quantile="{quantile}"}} '
+                             f'{_quantile(samples, quantile) / 1000:.6f}')
+            lines.append(f"planner_span_seconds_sum{{{labels}}} {totals.get('wall_ms', 0) / 1000:.6f}")
+            lines.append(f"planner_span_seconds_count{{{labels}}} {totals.get('count', 0)}")
+
+        counters = (
+            ("planner_span_queue_seconds_total", "queue_ms", "Time spent waiting before the span started", 1000),
+            ("planner_span_bytes_total", "bytes", "Bytes received by the span", 1),
+            ("planner_prompt_tokens_total", "prompt_tokens", "Prompt tokens consumed", 1),
+            ("planner_completion_tokens_total", "completion_tokens", "Completion tokens generated", 1),
+            ("planner_cache_hits_total", "cache_hits", "Cache hits observed inside the span", 1),
+            ("planner_cache_misses_total", "cache_misses", "Cache misses observed inside the span", 1),
+            ("planner_span_errors_total", "errors", "Spans that raised", 1),
+        )
+        for metric, field, help_text, divisor in counters:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for (kind, name), (_, totals) in sorted(snapshot.items()):
+                value = totals.get(field, 0) / divisor
+                lines.append(f'{metric}{{kind="{kind}",name="{name}"}} {value:g}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+
+def _quantile(sorted_values, quantile):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(quantile * len(sorted_values)))
+    return sorted_values[index]
+
+
+tracer = Tracer()
+
+
+def current_span():
+    """Return the innermost active span, if any"""
+    return _current_span.get()
+
+
+@contextmanager
+def span(kind, name, queue_ms=0.0, **attrs):
+    """Time the enclosed block as a span nested under the current one"""
+    if not tracer.enabled:
+        yield None
+        return
+    active = Span(kind, name, parent=_current_span.get(), queue_ms=queue_ms, **attrs)
+    token = _current_span.set(active)
+    started = time.perf_counter()
+    try:
+        yield active
+    except BaseException as e:
+        active.error = type(e).__name__
+        raise
+    finally:
+        active.wall_ms = (time.perf_counter() - started) * 1000
+        _current_span.reset(token)
+        tracer.record(active)
+
+
+def record_bytes(count):
+    active = _current_span.get()
+    if active is not None:
+        active.bytes += count
+
+
+def record_tokens(prompt_tokens, completion_tokens):
+    """Attribute token usage to the current span and every enclosing span"""
+    active = _current_span.get()
+    while active is not None:
+        active.prompt_tokens += prompt_tokens
+        active.completion_tokens += completion_tokens
+        active = active.parent
+
+
+def record_cache(cache_name, hit):
+    """Note a cache lookup on the current span"""
+    active = _current_span.get()
+    if active is not None:
+        (active.cache_hits if hit else active.cache_misses)[cache_name] += 1
+
+
+def annotate(**attrs):
+    """Attach extra attributes to the current span (exported with it)"""
+    active = _current_span.get()
+    if active is not None:
+        active.attrs.update(attrs)
+
+
+def traced_node(name, func, afunc):
+    """Wrap a sync/async node pair so every run is recorded as a node span"""
+
+    @functools.wraps(func)
+    def wrapper(state):
+        with span("node", name):
+            return func(state)
+
+    @functools.wraps(afunc)
+    async def awrapper(state):
+        with span("node", name):
+            return await afunc(state)
+
+    return wrapper, awrapper
+
+
+@functools.lru_cache(maxsize=None)
+def get_token_usage_callback():
+    """Return the shared LLM token usage callback, importing langchain_core on first use"""
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class TokenUsageCallback(BaseCallbackHandler):
+        """Record each chat model call as an llm span with its token usage"""
+
+        # Run inline so the callback sees the node's tracing context
+        run_inline = True
+
+        def __init__(self):
+            self._started = {}
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+            self._started[run_id] = time.perf_counter()
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            started = self._started.pop(run_id, None)
+            prompt_tokens = completion_tokens = 0
+            for generations in response.generations:
+                for generation in generations:
+                    usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                    if usage:
+                        prompt_tokens += usage.get("input_tokens", 0)
+                        completion_tokens += usage.get("output_tokens", 0)
+            if not tracer.enabled:
+                return
+            model = (response.llm_output or {}).get("model_name", "chat")
+            llm_span = Span("llm", model, parent=_current_span.get())
+            llm_span.wall_ms = (time.perf_counter() - started) * 1000 if started else 0.0
+            llm_span.prompt_tokens = prompt_tokens
+            llm_span.completion_tokens = completion_tokens
+            tracer.record(llm_span)
+            record_tokens(prompt_tokens, completion_tokens)
+
+        def on_llm_error(self, error, *, run_id, **kwargs):
+            self._started.pop(run_id, None)
+
+    return TokenUsageCallback()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("/metrics", ""):
+            self.send_error(404)
+            return
+        body = tracer.prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_metrics_server = None
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """Serve /metrics in Prometheus text format from a daemon thread"""
+    global _metrics_server
+    if _metrics_server is None:
+        _metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        threading.Thread(target=_metrics_server.serve_forever, name="metrics", daemon=True).start()
+    return _metrics_server
+
+
+def configure_tracing():
+    """Apply the tracing section of settings.yaml once per process"""
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return tracer
+        tracing_settings = get_settings().tracing
+        tracer.enabled = tracing_settings.enabled
+        if tracing_settings.jsonl_path:
+            tracer.add_exporter(JSONLExporter(tracing_settings.jsonl_path))
+        if tracing_settings.metrics_port:
+            start_metrics_server(tracing_settings.metrics_port, tracing_settings.metrics_host)
+        _configured = True
+        return tracer
@@ -1,161 +1,382 @@
-import datetime
 import json
 import os
-import requests
-import yaml
-import streamlit as st
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
+import http_client
+import tracing
+from constants import describe_weather_code
+from date_resolver import UnknownDateError, resolve_date, resolve_date_range
+from caching import MISSING, LRUCache, SingleFlight, TieredCache, normalize_key
+from settings import get_settings
 
-def load_config():
-    """Load configuration from config.json file"""
-    with open('config.json', 'r') as f:
-        return json.load(f)
 
+# Daily fields requested from the forecast API
+FORECAST_DAILY_FIELDS = "weathercode,temperature_2m_max,temperature_2m_min,precipitation_probability_max"
 
-def load_settings():
-    """Load settings from settings.yaml file"""
-    with open('settings.yaml', 'r') as f:
-        return yaml.safe_load(f)
 
+def _geocode_params(location):
+    return {"name": location, "count": 1, "language": "en", "format": "json"}
 
-def load_constants():
-    """Import constants from JavaScript file using PyExecJS"""
-    try:
-        # This is a simplified version - in a real app, you'd use PyExecJS or similar
-        # to properly import from the JS file
-        import execjs
-        with open('constants.js', 'r') as f:
-            js_code = f.read()
-        ctx = execjs.compile(js_code)
-        return ctx.eval('module.exports')
-    except ImportError:
-        # Fallback if execjs isn't available
-        return {
-            "WEATHER_CODES": {
-                0: "Clear sky", 1: "Mainly clear", 2: "Partly cloudy", 3: "Overcast",
-                45: "Fog", 48: "Depositing rime fog", 51: "Light drizzle", 53: "Moderate drizzle",
-                55: "Dense drizzle", 61: "Light rain", 63: "Moderate rain", 65: "Heavy rain",
-                71: "Light snow", 73: "Moderate snow", 75: "Heavy snow", 80: "Rain showers",
-                81: "Moderate rain showers", 82: "Violent rain showers", 95: "Thunderstorm",
-                96: "Thunderstorm with light hail", 99: "Thunderstorm with heavy hail",
-            }
-        }
 
+def _parse_geocode(payload):
+    """Reduce a geocoding API response to the fields the forecast lookup needs"""
+    results = payload.get('results')
+    if not results:
+        return None
+    result = results[0]
+    return {
+        "latitude": result['latitude'],
+        "longitude": result['longitude'],
+        "timezone": result.get('timezone', 'auto'),
+    }
 
-def get_next_date(date_str):
-    """Convert a date string to an actual date object"""
-    date_str = date_str.lower().strip()
-    days = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
-    today = datetime.date.today()
-    today_index = today.weekday()
-
-    # Handle weekend cases
-    if "weekend" in date_str:
-        # Find the next Saturday
-        days_to_saturday = (5 - today_index) % 7
-        if "next" in date_str:
-            # If it's already weekend, go to next weekend
-            if today_index >= 5:  # If today is Saturday or Sunday
-                days_to_saturday += 7
-            # If explicitly asking for next weekend
-            elif "next" in date_str:
-                days_to_saturday += 7
-        elif "this" in date_str:
-            # Use the upcoming weekend
-            pass
-
-        return today + datetime.timedelta(days=days_to_saturday)
-
-    # Handle other specific cases
-    if date_str.startswith("next "):
-        day_name = date_str[5:].strip()
-        try:
-            day_index = days.index(day_name)
-            days_ahead = (day_index - today_index) % 7 or 7
-            return today + datetime.timedelta(days=days_ahead)
-        except ValueError:
-            # If day name not found, return today as fallback
-            return today
-    elif date_str.startswith("this "):
-        day_name = date_str[5:].strip()
-        try:
-            day_index = days.index(day_name)
-            days_ahead = (day_index - today_index) % 7
-            return today + datetime.timedelta(days=days_ahead)
-        except ValueError:
-            # If day name not found, return today as fallback
-            return today
-    elif date_str.startswith("today"):
-        return today
-    elif date_str.startswith("tomorrow"):
-        return today + datetime.timedelta(days=1)
-    else:
+
+_cache_lock = threading.Lock()
+_geocode_cache = None
+_forecast_cache = None
+_geocode_flight = SingleFlight()
+_forecast_flight = SingleFlight()
+
+
+def get_cache_settings(name):
+    """Return (cache directory, CacheEntrySettings) for the named cache"""
+    cache_settings = get_settings().cache
+    return cache_settings.directory, getattr(cache_settings, name)
+
+
+def get_geocode_cache():
+    """Return the shared geocode cache (memory LRU backed by SQLite)"""
+    global _geocode_cache
+    if _geocode_cache is None:
+        with _cache_lock:
+            if _geocode_cache is None:
+                directory, geocode_settings = get_cache_settings("geocode")
+                path = os.path.join(directory, "geocode.sqlite3") if geocode_settings.persistent else None
+                _geocode_cache = TieredCache(
+                    memory_entries=geocode_settings.memory_entries,
+                    path=path,
+                    table="geocode",
+                )
+    return _geocode_cache
+
+
+def geocode_location(location):
+    """Resolve a location to coordinates, using the geocode cache before the API"""
+    cache = get_geocode_cache()
+    key = normalize_key(location)
+    coordinates = cache.get(key)
+    tracing.record_cache("geocode", coordinates is not MISSING)
+    if coordinates is not MISSING:
+        return coordinates
+
+    def load():
+        # Another caller may have filled the cache while we waited to lead
+        cached = cache.get(key)
+        if cached is not MISSING:
+            return cached
+        response = http_client.get(get_settings().api.weather.geocoding_url, params=_geocode_params(location))
+        if response.status_code != 200:
+            return None
+        fetched = _parse_geocode(response.json())
+        if fetched is not None:
+            cache.put(key, fetched)
+        return fetched
+
+    return _geocode_flight.do(key, load)
+
+
+async def ageocode_location(location):
+    """Async variant of geocode_location"""
+    cache = get_geocode_cache()
+    key = normalize_key(location)
+    coordinates = cache.get(key)
+    tracing.record_cache("geocode", coordinates is not MISSING)
+    if coordinates is not MISSING:
+        return coordinates
+
+    async def load():
+        cached = cache.get(key)
+        if cached is not MISSING:
+            return cached
+        response = await http_client.aget(get_settings().api.weather.geocoding_url,
+                                          params=_geocode_params(location))
+        if response.status_code != 200:
+            return None
+        fetched = _parse_geocode(response.json())
+        if fetched is not None:
+            cache.put(key, fetched)
+        return fetched
+
+    return await _geocode_flight.ado(key, load)
+
+
+def get_forecast_cache():
+    """Return the shared in-memory daily forecast cache"""
+    global _forecast_cache
+    if _forecast_cache is None:
+        with _cache_lock:
+            if _forecast_cache is None:
+                _, forecast_settings = get_cache_settings("forecast")
+                # Open-Meteo refreshes its models roughly hourly, so an hour-old forecast is still current
+                _forecast_cache = LRUCache(
+                    max_entries=forecast_settings.memory_entries,
+                    ttl_seconds=forecast_settings.ttl_seconds,
+                )
+    return _forecast_cache
+
+
+def _forecast_key(coordinates):
+    return (round(coordinates['latitude'], 4), round(coordinates['longitude'], 4),
+            coordinates.get('timezone', 'auto'))
+
+
+def get_daily_forecast(coordinates):
+    """Return the daily forecast window for coordinates, fetching at most once per TTL"""
+    cache = get_forecast_cache()
+    key = _forecast_key(coordinates)
+    daily = cache.get(key)
+    tracing.record_cache("forecast", daily is not MISSING)
+    if daily is not MISSING:
+        return daily
+
+    def load():
+        # Another caller may have filled the cache while we waited to lead
+        cached = cache.get(key)
+        if cached is not MISSING:
+            return cached
+        response = http_client.get(get_settings().api.weather.forecast_url, params=_forecast_params(coordinates))
+        if response.status_code != 200:
+            return None
+        fetched = response.json()['daily']
+        cache.put(key, fetched)
+        return fetched
+
+    return _forecast_flight.do(key, load)
+
+
+async def aget_daily_forecast(coordinates):
+    """Async variant of get_daily_forecast"""
+    cache = get_forecast_cache()
+    key = _forecast_key(coordinates)
+    daily = cache.get(key)
+    tracing.record_cache("forecast", daily is not MISSING)
+    if daily is not MISSING:
+        return daily
+
+    async def load():
+        cached = cache.get(key)
+        if cached is not MISSING:
+            return cached
+        response = await http_client.aget(get_settings().api.weather.forecast_url,
+                                          params=_forecast_params(coordinates))
+        if response.status_code != 200:
+            return None
+        fetched = response.json()['daily']
+        cache.put(key, fetched)
+        return fetched
+
+    return await _forecast_flight.ado(key, load)
+
+
+def forecast_expires_at(location):
+    """Return when the cached forecast for location expires (None if never), or MISSING when none is cached"""
+    coordinates = get_geocode_cache().get(normalize_key(location))
+    if coordinates is MISSING or coordinates is None:
+        return MISSING
+    return get_forecast_cache().expires_at(_forecast_key(coordinates))
+
+
+def prewarm_geocode_cache(cities, concurrency=8):
+    """Geocode every uncached city in cities so later plans skip the network"""
+    cache = get_geocode_cache()
+    pending = {}
+    summary = {"requested": 0, "already_cached": 0, "fetched": 0, "not_found": 0, "failed": 0}
+    for city in cities:
+        city = city.strip()
+        if not city:
+            continue
+        summary["requested"] += 1
+        key = normalize_key(city)
+        if key in pending or cache.get(key) is not MISSING:
+            summary["already_cached"] += 1
+        else:
+            pending[key] = city
+
+    def warm(city):
         try:
-            day_name = date_str
-            day_index = days.index(day_name)
-            days_ahead = (day_index - today_index) % 7 or 7
-            return today + datetime.timedelta(days=days_ahead)
-        except ValueError:
-            # Try to parse as YYYY-MM-DD
-            try:
-                return datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
-            except ValueError:
-                # Return today as fallback
-                return today
-
-
-def fetch_weather(location, date_str, weather_codes):
+            return "fetched" if geocode_location(city) is not None else "not_found"
+        except Exception:
+            return "failed"
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for outcome in executor.map(warm, pending.values()):
+            summary[outcome] += 1
+    return summary
+
+
+def _forecast_params(coordinates):
+    return {
+        "latitude": coordinates['latitude'],
+        "longitude": coordinates['longitude'],
+        "daily": FORECAST_DAILY_FIELDS,
+        "timezone": coordinates.get('timezone', 'auto'),
+    }
+
+
+def build_weather_report(location, target_date, data):
+    """Pick the target date out of a daily forecast and format the weather report"""
+    target_date_str = target_date.strftime("%Y-%m-%d")
+
+    if target_date_str in data['time']:
+        index = data['time'].index(target_date_str)
+        weather_code = data['weathercode'][index]
+        max_temp = data['temperature_2m_max'][index]
+        min_temp = data['temperature_2m_min'][index]
+        precip_prob = data.get('precipitation_probability_max', [0] * len(data['time']))[index]
+
+        description = describe_weather_code(weather_code)
+
+        # Format a more detailed weather report
+        weather_report = {
+            "location": location,
+            "date": target_date_str,
+            "day_name": target_date.strftime("%A"),
+            "description": description,
+            "max_temp": max_temp,
+            "min_temp": min_temp,
+            "precipitation_probability": precip_prob,
+            "weather_code": weather_code
+        }
+
+        return json.dumps(weather_report), True
+
+    return f"📍 **{location}**: Weather forecast not available for {target_date_str}", True
+
+
+def fetch_weather(location, date_str):
     """Fetch weather data for location and date"""
-    config = load_config()
-    target_date = get_next_date(date_str)
+    try:
+        target_date = resolve_date(date_str)
+    except UnknownDateError:
+        return f"📍 **{location}**: Weather data not available (unrecognized date '{date_str}')", True
 
     try:
-        # Geocoding request
-        geocode_url = f"{config['api']['weather']['geocoding_url']}?name={location}&count=1&language=en&format=json"
-        response = requests.get(geocode_url)
-        if response.status_code != 200 or not response.json().get('results'):
+        # Geocoding (served from the cache for known cities)
+        coordinates = geocode_location(location)
+        if coordinates is None:
             return f"📍 **{location}**: Weather data not available (location not found)", True
 
-        result = response.json()['results'][0]
-        latitude, longitude = result['latitude'], result['longitude']
+        # Daily forecast window (served from the cache within its TTL)
+        daily = get_daily_forecast(coordinates)
+        if daily is None:
+            return f"📍 **{location}**: Weather data not available (API error)", True
 
-        # Weather request
-        weather_url = f"{config['api']['weather']['forecast_url']}?latitude={latitude}&longitude={longitude}&daily=weathercode,temperature_2m_max,temperature_2m_min,precipitation_probability_max&timezone=auto"
-        response = requests.get(weather_url)
+        return build_weather_report(location, target_date, daily)
 
-        if response.status_code != 200:
+    except Exception as e:
+        return f"📍 **{location}**: Error fetching weather data: {str(e)}", True
+
+
+async def afetch_weather(location, date_str):
+    """Fetch weather data for location and date without blocking the event loop"""
+    try:
+        target_date = resolve_date(date_str)
+    except UnknownDateError:
+        return f"📍 **{location}**: Weather data not available (unrecognized date '{date_str}')", True
+
+    try:
+        # Geocoding (served from the cache for known cities)
+        coordinates = await ageocode_location(location)
+        if coordinates is None:
+            return f"📍 **{location}**: Weather data not available (location not found)", True
+
+        # Daily forecast window (served from the cache within its TTL)
+        daily = await aget_daily_forecast(coordinates)
+        if daily is None:
             return f"📍 **{location}**: Weather data not available (API error)", True
 
-        data = response.json()['daily']
-        target_date_str = target_date.strftime("%Y-%m-%d")
+        return build_weather_report(location, target_date, daily)
+
+    except Exception as e:
+        return f"📍 **{location}**: Error fetching weather data: {str(e)}", True
+
+
+def _flexible_range(date_str):
+    """Resolve the span a flexible date may move within, or None for the whole forecast window"""
+    try:
+        date_range = resolve_date_range(date_str) if date_str else None
+    except UnknownDateError:
+        return None
+    # A single day leaves nothing to choose from, so search the whole window instead
+    return date_range if date_range is not None and date_range.days > 1 else None
 
-        if target_date_str in data['time']:
-            index = data['time'].index(target_date_str)
-            weather_code = data['weathercode'][index]
-            max_temp = data['temperature_2m_max'][index]
-            min_temp = data['temperature_2m_min'][index]
-            precip_prob = data.get('precipitation_probability_max', [0] * len(data['time']))[index]
 
-            description = weather_codes.get(weather_code, "Unknown")
+def build_best_days_report(location, date_str, data):
+    """Rank the forecast window and format the best day as the weather report"""
+    # Imported here so only flexible-date plans load numpy
+    import forecast_scoring
 
-            # Format a more detailed weather report
-            weather_report = {
-                "location": location,
-                "date": target_date_str,
-                "day_name": target_date.strftime("%A"),
-                "description": description,
-                "max_temp": max_temp,
-                "min_temp": min_temp,
-                "precipitation_probability": precip_prob,
-                "weather_code": weather_code
-            }
+    ranked_days = forecast_scoring.rank_forecast_window(data, _flexible_range(date_str))
+    if not ranked_days:
+        return f"📍 **{location}**: Weather forecast not available for '{date_str}'", []
+    best_day = {key: value for key, value in ranked_days[0].items() if key != "score"}
+    return json.dumps({"location": location, **best_day}), ranked_days
 
-            return json.dumps(weather_report), True
 
-        return f"📍 **{location}**: Weather forecast not available for {target_date_str}", True
+def fetch_best_days(location, date_str):
+    """Rank the days in the forecast window for a flexible-date event.
+
+    Returns (weather_report for the best day, ranked days). date_str narrows the
+    search when it spans several days ("next week"); otherwise the whole window
+    is ranked. Uses a single (cached) forecast fetch.
+    """
+    try:
+        coordinates = geocode_location(location)
+        if coordinates is None:
+            return f"📍 **{location}**: Weather data not available (location not found)", []
+
+        daily = get_daily_forecast(coordinates)
+        if daily is None:
+            return f"📍 **{location}**: Weather data not available (API error)", []
+
+        return build_best_days_report(location, date_str, daily)
 
     except Exception as e:
-        return f"📍 **{location}**: Error fetching weather data: {str(e)}", True
+        return f"📍 **{location}**: Error fetching weather data: {str(e)}", []
+
+
+async def afetch_best_days(location, date_str):
+    """Async variant of fetch_best_days"""
+    try:
+        coordinates = await ageocode_location(location)
+        if coordinates is None:
+            return f"📍 **{location}**: Weather data not available (location not found)", []
+
+        daily = await aget_daily_forecast(coordinates)
+        if daily is None:
+            return f"📍 **{location}**: Weather data not available (API error)", []
+
+        return build_best_days_report(location, date_str, daily)
+
+    except Exception as e:
+        return f"📍 **{location}**: Error fetching weather data: {str(e)}", []
+
+
+def build_structured_input(event_type, location, date_str, additional_requirements="", recommendation_mode=None,
+                           flexible_date=False):
+    """Build graph input from form fields so the graph can skip query analysis"""
+    graph_input = {
+        "event": event_type.strip(),
+        "location": location.strip(),
+        "date": date_str.strip(),
+        "requirements": (additional_requirements or "").strip(),
+    }
+    if recommendation_mode:
+        graph_input["recommendation_mode"] = recommendation_mode
+    if flexible_date:
+        graph_input["flexible_date"] = True
+    return graph_input
 
 
 def render_weather_card(weather_data):
@@ -190,7 +411,3 @@ def render_venue_card(venue):
     </div>
     """
 
-
-def both_paths_complete(state):
-    """Check if both parallel paths (weather and venues) are complete"""
-    return state.get("weather_ready") and state.get("venues_ready")
\ No newline at end of file